@@ -1,47 +1,381 @@
 #!/usr/bin/env python3
-import boto3
+"""Submit jobs to AWS Batch and follow them until they finish.
+
+python console.py dbt --wait --logs run --select stg_launches
+python console.py submit ingestion-job-small --command python spacex/ingest.py
+python console.py submit --jobs jobs.json --wait
+python console.py backfill --shards 50 --wait
+python console.py wait <job-id> ... --logs
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+REGION = "eu-west-1"
+#: Queues from BatchConfig.queues, Fargate Spot first or on-demand only
+QUEUES = {True: "dpstack-batch-queue", False: "dpstack-batch-ondemand-queue"}
+#: Where the awslogs driver of the job definitions writes container output
+LOG_GROUP = "/aws/batch/job"
+#: Retry throttled Batch and CloudWatch Logs calls, at a rate adapted to them
+CLIENT_CONFIG = Config(retries={"mode": "adaptive", "max_attempts": 10})
+FINISHED = ("SUCCEEDED", "FAILED")
 
-def submit_dbt_run_job():
-    """Submit dbt run job to AWS Batch"""
 
-    # Initialize AWS Batch client
-    batch_client = boto3.client("batch", region_name="eu-west-1")
+def job_definition_for(name: str, profile: str | None) -> str:
+    """Job definition registered for a resource profile, see BatchConfig"""
 
-    # Job parameters
-    job_name = f"dbt-run-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-    job_definition = "dbt-transformation-job"
-    job_queue = "dpstack-batch-queue"  # Replace with actual queue name
+    return f"{name}-{profile}" if profile else name
 
-    # Override command to run dbt
-    overrides = {
-        "command": ["dbt", "debug"],
-        "environment": [
-            {"name": "DBT_PROFILES_DIR", "value": "./"},
-            {"name": "DBT_TARGET_PATH", "value": "dbt/target"},
-            {"name": "DBT_LOG_PATH", "value": "dbt/logs"},
-        ],
-    }
 
-    try:
-        response = batch_client.submit_job(
-            jobName=job_name,
-            jobQueue=job_queue,
+def timestamped(name: str) -> str:
+    return f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+
+@dataclass
+class JobReport:
+    job_id: str
+    name: str
+    status: str
+    #: From submission to start: dependencies, queue and Fargate provisioning
+    queued_seconds: float
+    running_seconds: float
+    reason: str = ""
+
+
+class BatchJobs:
+    """Submit Batch jobs and wait for them, polling their status in batches.
+
+    Jobs are described up to DESCRIBE_LIMIT ids per DescribeJobs call. The
+    poll delay doubles while no job changes status, up to max_delay, and
+    goes back to min_delay when one does.
+    """
+
+    #: Most job ids DescribeJobs takes in one call
+    DESCRIBE_LIMIT = 100
+
+    def __init__(
+        self,
+        queue: str = QUEUES[True],
+        region_name: str = REGION,
+        batch=None,
+        logs=None,
+    ):
+        self.queue = queue
+        self.batch = batch or boto3.client(
+            "batch", region_name=region_name, config=CLIENT_CONFIG
+        )
+        self.logs = logs or boto3.client(
+            "logs", region_name=region_name, config=CLIENT_CONFIG
+        )
+        #: Log stream -> token to read its next events from
+        self._log_tokens = {}
+
+    def submit(
+        self,
+        name: str,
+        job_definition: str,
+        command: list[str] | None = None,
+        environment: dict[str, str] | None = None,
+        vcpus: float | None = None,
+        memory_mib: int | None = None,
+        depends_on: list[str] | None = None,
+        array_size: int | None = None,
+        queue: str | None = None,
+    ) -> str:
+        """Submit a job, overriding the job definition where given, and
+        return its id"""
+
+        overrides = {}
+        if command:
+            overrides["command"] = command
+        if environment:
+            overrides["environment"] = [
+                {"name": key, "value": value} for key, value in environment.items()
+            ]
+        resources = {"VCPU": vcpus and f"{vcpus:g}", "MEMORY": memory_mib}
+        if any(resources.values()):
+            overrides["resourceRequirements"] = [
+                {"type": type_, "value": str(value)}
+                for type_, value in resources.items()
+                if value
+            ]
+
+        args = {}
+        if depends_on:
+            args["dependsOn"] = [{"jobId": job_id} for job_id in depends_on]
+        if array_size:
+            args["arrayProperties"] = {"size": array_size}
+
+        response = self.batch.submit_job(
+            jobName=name,
+            jobQueue=queue or self.queue,
             jobDefinition=job_definition,
-            parameters={},
             containerOverrides=overrides,
+            **args,
         )
-
-        print("✅ Job submitted successfully!")
-        print(f"Job ID: {response['jobId']}")
-        print(f"Job Name: {response['jobName']}")
+        print(f"✅ Submitted {name}: {response['jobId']}")
         return response["jobId"]
 
-    except Exception as e:
-        print(f"❌ Error submitting job: {str(e)}")
-        return None
+    def submit_many(self, jobs: list[dict], max_workers: int = 8) -> list[str]:
+        """Submit jobs concurrently, each a dict of submit() arguments, and
+        return their ids in the same order"""
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(lambda job: self.submit(**job), jobs))
+
+    def describe(self, job_ids: list[str]) -> list[dict]:
+        jobs = []
+        for start in range(0, len(job_ids), self.DESCRIBE_LIMIT):
+            response = self.batch.describe_jobs(
+                jobs=job_ids[start : start + self.DESCRIBE_LIMIT]
+            )
+            jobs += response["jobs"]
+        return jobs
+
+    def stream_logs(self, job: dict):
+        """Print the container output of a job written since the last call"""
+
+        stream = job.get("container", {}).get("logStreamName")
+        if not stream:
+            return
+
+        while True:
+            args = (
+                {"nextToken": self._log_tokens[stream]}
+                if stream in self._log_tokens
+                else {}
+            )
+            try:
+                response = self.logs.get_log_events(
+                    logGroupName=LOG_GROUP,
+                    logStreamName=stream,
+                    startFromHead=True,
+                    **args,
+                )
+            except self.logs.exceptions.ResourceNotFoundException:
+                #: The stream is created once the container writes to it
+                return
+            for event in response["events"]:
+                print(f"  {job['jobName']} | {event['message']}")
+            self._log_tokens[stream] = response["nextForwardToken"]
+            if not response["events"]:
+                return
+
+    @staticmethod
+    def report(job: dict) -> JobReport:
+        """Time a finished job spent waiting to start and running, from the
+        epoch milliseconds Batch records"""
+
+        created, stopped = job["createdAt"], job.get("stoppedAt", job["createdAt"])
+        started = job.get("startedAt", stopped)
+        return JobReport(
+            job_id=job["jobId"],
+            name=job["jobName"],
+            status=job["status"],
+            queued_seconds=(started - created) / 1000,
+            running_seconds=(stopped - started) / 1000,
+            reason=job.get("statusReason", ""),
+        )
+
+    def wait(
+        self,
+        job_ids: list[str],
+        logs: bool = False,
+        min_delay: float = 5,
+        max_delay: float = 60,
+    ) -> list[JobReport]:
+        """Poll jobs until every one of them finished, printing their status
+        changes, and their output with logs, and report them in finish order"""
+
+        pending, statuses, reports = list(job_ids), {}, []
+        delay = min_delay
+        while pending:
+            changed = False
+            for job in self.describe(pending):
+                status = job["status"]
+                if statuses.get(job["jobId"]) != status:
+                    statuses[job["jobId"]] = status
+                    changed = True
+                    summary = job.get("arrayProperties", {}).get("statusSummary")
+                    print(
+                        f"… {job['jobName']}: {status}"
+                        + (f" {summary}" if summary else "")
+                    )
+                if logs:
+                    self.stream_logs(job)
+                if status in FINISHED:
+                    pending.remove(job["jobId"])
+                    reports.append(self.report(job))
+
+            if pending:
+                delay = min_delay if changed else min(delay * 2, max_delay)
+                time.sleep(delay)
+
+        return reports
+
+
+def print_reports(reports: list[JobReport]):
+    """Print where the time of each job went, queued versus running"""
+
+    for report in reports:
+        print(
+            f"{'✅' if report.status == 'SUCCEEDED' else '❌'} {report.name} "
+            f"{report.status}: queued {report.queued_seconds:.1f}s, "
+            f"ran {report.running_seconds:.1f}s"
+            + (f" ({report.reason})" if report.status == "FAILED" else "")
+        )
+
+    queued = sum(report.queued_seconds for report in reports)
+    running = sum(report.running_seconds for report in reports)
+    if queued + running:
+        print(
+            f"Total: queued {queued:.1f}s, ran {running:.1f}s, "
+            f"{100 * queued / (queued + running):.0f}% of job time spent queued"
+        )
+
+
+def submit_dbt_job(
+    jobs: BatchJobs, args: list[str] | None = None, profile: str | None = None
+) -> str:
+    """Submit a dbt command, dbt debug by default, to AWS Batch"""
+
+    return jobs.submit(
+        timestamped("dbt-run"),
+        job_definition_for("dbt-transformation-job", profile),
+        command=["dbt", *(args or ["debug"])],
+    )
+
+
+def submit_backfill_jobs(
+    jobs: BatchJobs,
+    shards: int,
+    profile: str | None = "large",
+    load_profile: str | None = "small",
+) -> tuple[str, str]:
+    """Submit a SpaceX backfill to AWS Batch: an array job transforming every
+    raw object again, one shard per child, then a load that waits for it"""
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    #: Each child reads its shard from AWS_BATCH_JOB_ARRAY_INDEX
+    transformation = jobs.submit(
+        f"spacex-backfill-{timestamp}",
+        job_definition_for("ingestion-job", profile),
+        command=[
+            "python",
+            "spacex/transformation.py",
+            "--backfill",
+            f"--shards={shards}",
+        ],
+        array_size=shards,
+    )
+    #: Starts once every child succeeded, fails if any child failed
+    load = jobs.submit(
+        f"spacex-backfill-load-{timestamp}",
+        job_definition_for("ingestion-job", load_profile),
+        command=["python", "spacex/ingest.py"],
+        depends_on=[transformation],
+    )
+    return transformation, load
+
+
+def parse_environment(values: list[str]) -> dict[str, str]:
+    return dict(value.split("=", 1) for value in values)
 
 
 if __name__ == "__main__":
-    submit_dbt_run_job()
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--profile",
+        choices=["small", "medium", "large"],
+        help="Resource profile, the job definition default if not given",
+    )
+    common.add_argument(
+        "--on-demand", action="store_true", help="Don't run on Fargate Spot"
+    )
+    common.add_argument(
+        "--wait", action="store_true", help="Wait for the jobs to finish"
+    )
+    common.add_argument(
+        "--logs", action="store_true", help="Stream job output while waiting"
+    )
+
+    parser = argparse.ArgumentParser(description="Submit jobs to AWS Batch")
+    commands = parser.add_subparsers(dest="job")
+
+    dbt = commands.add_parser("dbt", parents=[common], help="Run a dbt command")
+    dbt.add_argument("dbt_args", nargs=argparse.REMAINDER, help="dbt debug if empty")
+
+    submit = commands.add_parser(
+        "submit", parents=[common], help="Submit any job definition"
+    )
+    submit.add_argument("definition", nargs="?", help="Job definition name")
+    submit.add_argument("--name", help="Job name, the definition's by default")
+    submit.add_argument(
+        "--command", nargs=argparse.REMAINDER, help="Last, takes the rest of the line"
+    )
+    submit.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE")
+    submit.add_argument("--vcpus", type=float)
+    submit.add_argument("--memory", type=int, help="MiB")
+    submit.add_argument(
+        "--jobs", type=argparse.FileType(), help="JSON list of submit arguments"
+    )
+
+    backfill = commands.add_parser(
+        "backfill", parents=[common], help="Transform every raw object again"
+    )
+    backfill.add_argument(
+        "--shards", type=int, default=10, help="Backfill array size, 2 to 10000"
+    )
+
+    wait = commands.add_parser("wait", parents=[common], help="Wait for jobs")
+    wait.add_argument("job_ids", nargs="+")
+
+    #: A bare console.py keeps submitting dbt debug
+    args = parser.parse_args(sys.argv[1:] or ["dbt"])
+    if args.job == "backfill" and not 2 <= args.shards <= 10_000:
+        parser.error("--shards must be between 2 and 10000 for an array job")
+    if args.job == "submit" and not (args.definition or args.jobs):
+        parser.error("submit needs a job definition or --jobs")
+
+    jobs = BatchJobs(QUEUES[not args.on_demand])
+    try:
+        if args.job == "dbt":
+            job_ids = [submit_dbt_job(jobs, args.dbt_args, args.profile)]
+        elif args.job == "backfill":
+            job_ids = list(
+                submit_backfill_jobs(jobs, args.shards, args.profile or "large")
+            )
+        elif args.job == "submit" and args.jobs:
+            job_ids = jobs.submit_many(json.load(args.jobs))
+        elif args.job == "submit":
+            job_ids = [
+                jobs.submit(
+                    args.name or timestamped(args.definition),
+                    job_definition_for(args.definition, args.profile),
+                    command=args.command,
+                    environment=parse_environment(args.env),
+                    vcpus=args.vcpus,
+                    memory_mib=args.memory,
+                )
+            ]
+        else:
+            job_ids, args.wait = args.job_ids, True
+
+        if args.wait or args.logs:
+            reports = jobs.wait(job_ids, logs=args.logs)
+            print_reports(reports)
+            if any(report.status != "SUCCEEDED" for report in reports):
+                sys.exit(1)
+    except (BotoCoreError, ClientError) as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
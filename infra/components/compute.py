@@ -58,38 +58,68 @@ class BatchCompute(Construct):
             description="Ingress from other containers in the same security group",
         )
 
-        # Create Batch compute environment
-        self.compute_environment = aws_batch.CfnComputeEnvironment(
+        # Create Batch compute environments, on-demand and Spot
+        self.compute_environment = self._compute_environment(
+            "BatchComputeEnvironment", "FARGATE", config.max_vcpus, vpc, config
+        )
+        self.spot_compute_environment = self._compute_environment(
+            "BatchSpotComputeEnvironment",
+            "FARGATE_SPOT",
+            config.spot_max_vcpus,
+            vpc,
+            config,
+        )
+
+        # Create Batch job queues
+        self.job_queues = {}
+        for index, queue in enumerate(config.queues):
+            #: Spot queues place jobs on Fargate Spot until spot_max_vcpus are
+            #: in use, and on on-demand Fargate after that
+            environments = [self.compute_environment]
+            if queue.spot:
+                environments.insert(0, self.spot_compute_environment)
+
+            job_queue = aws_batch.CfnJobQueue(
+                self,
+                "BatchJobQueue" if index == 0 else f"BatchJobQueue{queue.name.title()}",
+                job_queue_name=queue.name,
+                compute_environment_order=[
+                    aws_batch.CfnJobQueue.ComputeEnvironmentOrderProperty(
+                        compute_environment=environment.ref,
+                        order=order,
+                    )
+                    for order, environment in enumerate(environments, start=1)
+                ],
+                priority=queue.priority,
+                state="ENABLED",
+            )
+            job_queue.apply_removal_policy(RemovalPolicy[config.removal_policy])
+            self.job_queues[queue.name] = job_queue
+
+        self.job_queue = self.job_queues[config.queues[0].name]
+
+    def _compute_environment(
+        self,
+        construct_id: str,
+        type_: str,
+        max_vcpus: int,
+        vpc: aws_ec2.Vpc,
+        config: BatchConfig,
+    ) -> aws_batch.CfnComputeEnvironment:
+        compute_environment = aws_batch.CfnComputeEnvironment(
             self,
-            "BatchComputeEnvironment",
+            construct_id,
             type="MANAGED",
             service_role=self.batch_service_role.role_arn,
             compute_resources=aws_batch.CfnComputeEnvironment.ComputeResourcesProperty(
-                type="FARGATE",
-                maxv_cpus=config.max_vcpus,
+                type=type_,
+                maxv_cpus=max_vcpus,
                 security_group_ids=[self.ecs_host_security_group.security_group_id],
                 subnets=[subnet.subnet_id for subnet in vpc.private_subnets],
             ),
             state="ENABLED",
         )
 
-        # Create Batch job queue
-        self.job_queue = aws_batch.CfnJobQueue(
-            self,
-            "BatchJobQueue",
-            job_queue_name=config.queue_name,
-            compute_environment_order=[
-                aws_batch.CfnJobQueue.ComputeEnvironmentOrderProperty(
-                    compute_environment=self.compute_environment.ref,
-                    order=1,
-                )
-            ],
-            priority=1,
-            state="ENABLED",
-        )
-
         # Apply removal policy
-        self.compute_environment.apply_removal_policy(
-            RemovalPolicy[config.removal_policy]
-        )
-        self.job_queue.apply_removal_policy(RemovalPolicy[config.removal_policy])
+        compute_environment.apply_removal_policy(RemovalPolicy[config.removal_policy])
+        return compute_environment
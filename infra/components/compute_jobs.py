@@ -1,8 +1,11 @@
+from typing import Callable
+
 from aws_cdk import (
     aws_batch,
     aws_ecr,
     aws_iam,
 )
+from config import BatchConfig, JobProfile
 from constructs import Construct
 
 
@@ -13,6 +16,8 @@ class ComputeJob(Construct):
         construct_id: str,
         dbt_image: aws_ecr.Repository,
         ingestion_image: aws_ecr.Repository,
+        config: BatchConfig,
+        redshift_slices: int,
         **kwargs,
     ):
         super().__init__(scope, construct_id, **kwargs)
@@ -98,72 +103,99 @@ class ComputeJob(Construct):
             )
         )
 
-        # Job Definition for DBT Transformation
-        self.dbt_job_definition = aws_batch.CfnJobDefinition(
-            self,
+        # Job Definitions for DBT Transformation
+        self.dbt_job_definitions = self._job_definitions(
             "DbtJobDefinition",
-            job_definition_name="dbt-transformation-job",
-            type="container",
-            retry_strategy=aws_batch.CfnJobDefinition.RetryStrategyProperty(attempts=1),
-            platform_capabilities=["FARGATE"],
-            container_properties=aws_batch.CfnJobDefinition.ContainerPropertiesProperty(
-                environment=[
-                    aws_batch.CfnJobDefinition.EnvironmentProperty(
-                        name="DBT_PROFILES_DIR", value="./"
-                    ),
-                    aws_batch.CfnJobDefinition.EnvironmentProperty(
-                        name="DBT_TARGET_PATH", value="dbt/target"
-                    ),
-                    aws_batch.CfnJobDefinition.EnvironmentProperty(
-                        name="DBT_LOG_PATH", value="dbt/logs"
-                    ),
-                ],
-                job_role_arn=self.batch_container_role.role_arn,
-                execution_role_arn=self.task_execution_role.role_arn,
-                command=["echo", "test"],
-                image=f"{dbt_image.repository_uri}:latest",
-                resource_requirements=[
-                    aws_batch.CfnJobDefinition.ResourceRequirementProperty(
-                        type="MEMORY", value="2048"
-                    ),
-                    aws_batch.CfnJobDefinition.ResourceRequirementProperty(
-                        type="VCPU", value="1"
-                    ),
-                ],
-            ),
+            "dbt-transformation-job",
+            dbt_image,
+            config,
+            environment=lambda profile: {
+                "DBT_PROFILES_DIR": "./",
+                "DBT_TARGET_PATH": "dbt/target",
+                "DBT_LOG_PATH": "dbt/logs",
+            },
         )
+        self.dbt_job_definition = self.dbt_job_definitions[None]
 
-        # Job Definition for DBT Transformation
-        self.ingestion_job_definition = aws_batch.CfnJobDefinition(
-            self,
+        # Job Definitions for Ingestion
+        self.ingestion_job_definitions = self._job_definitions(
             "IgnestionJobDefinition",
-            job_definition_name="ingestion-job",
-            type="container",
-            retry_strategy=aws_batch.CfnJobDefinition.RetryStrategyProperty(attempts=1),
-            platform_capabilities=["FARGATE"],
-            container_properties=aws_batch.CfnJobDefinition.ContainerPropertiesProperty(
-                environment=[
-                    aws_batch.CfnJobDefinition.EnvironmentProperty(
-                        name="DBT_PROFILES_DIR", value="./"
-                    ),
-                    aws_batch.CfnJobDefinition.EnvironmentProperty(
-                        name="DBT_TARGET_PATH", value="dbt/target"
-                    ),
-                    aws_batch.CfnJobDefinition.EnvironmentProperty(
-                        name="DBT_LOG_PATH", value="dbt/logs"
-                    ),
-                ],
-                job_role_arn=self.batch_container_role.role_arn,
-                execution_role_arn=self.task_execution_role.role_arn,
-                command=["echo", "test"],
-                image=f"{ingestion_image.repository_uri}:latest",
-                resource_requirements=[
-                    aws_batch.CfnJobDefinition.ResourceRequirementProperty(
-                        type="MEMORY", value="2048"
-                    ),
-                    aws_batch.CfnJobDefinition.ResourceRequirementProperty(
-                        type="VCPU", value="1"
+            "ingestion-job",
+            ingestion_image,
+            config,
+            #: One transformation worker process per vCPU of the profile, and
+            #: COPY files split across the capacity of the warehouse
+            environment=lambda profile: {
+                "TRANSFORM_WORKERS": str(max(1, int(profile.vcpus))),
+                "REDSHIFT_SLICES": str(redshift_slices),
+            },
+        )
+        self.ingestion_job_definition = self.ingestion_job_definitions[None]
+
+    def _job_definitions(
+        self,
+        construct_id: str,
+        name: str,
+        image: aws_ecr.Repository,
+        config: BatchConfig,
+        environment: Callable[[JobProfile], dict[str, str]],
+    ) -> dict[str | None, aws_batch.CfnJobDefinition]:
+        """Register name with the default profile, and name-<profile> for every
+        profile, keyed by profile name and None for the default"""
+
+        profiles = {None: config.profiles[config.default_profile]}
+        profiles.update(config.profiles)
+
+        definitions = {}
+        for profile_name, profile in profiles.items():
+            suffix = f"-{profile_name}" if profile_name else ""
+            definitions[profile_name] = aws_batch.CfnJobDefinition(
+                self,
+                f"{construct_id}{profile_name.title() if profile_name else ''}",
+                job_definition_name=f"{name}{suffix}",
+                type="container",
+                retry_strategy=self._retry_strategy(config),
+                platform_capabilities=["FARGATE"],
+                container_properties=aws_batch.CfnJobDefinition.ContainerPropertiesProperty(
+                    environment=[
+                        aws_batch.CfnJobDefinition.EnvironmentProperty(
+                            name=key, value=value
+                        )
+                        for key, value in environment(profile).items()
+                    ],
+                    job_role_arn=self.batch_container_role.role_arn,
+                    execution_role_arn=self.task_execution_role.role_arn,
+                    command=["echo", "test"],
+                    image=f"{image.repository_uri}:latest",
+                    resource_requirements=[
+                        aws_batch.CfnJobDefinition.ResourceRequirementProperty(
+                            type="MEMORY", value=str(profile.memory_mib)
+                        ),
+                        aws_batch.CfnJobDefinition.ResourceRequirementProperty(
+                            type="VCPU", value=f"{profile.vcpus:g}"
+                        ),
+                    ],
+                    ephemeral_storage=aws_batch.CfnJobDefinition.EphemeralStorageProperty(
+                        size_in_gib=profile.ephemeral_storage_gib
                     ),
-                ],
-            ),
+                ),
+            )
+        return definitions
+
+    @staticmethod
+    def _retry_strategy(
+        config: BatchConfig,
+    ) -> aws_batch.CfnJobDefinition.RetryStrategyProperty:
+        """Retry jobs stopped by a Fargate Spot reclaim, fail on anything else"""
+
+        return aws_batch.CfnJobDefinition.RetryStrategyProperty(
+            attempts=config.spot_retry_attempts,
+            evaluate_on_exit=[
+                aws_batch.CfnJobDefinition.EvaluateOnExitProperty(
+                    action="RETRY", on_status_reason="Your Spot Task was interrupted*"
+                ),
+                aws_batch.CfnJobDefinition.EvaluateOnExitProperty(
+                    action="EXIT", on_reason="*"
+                ),
+            ],
         )
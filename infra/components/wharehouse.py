@@ -97,8 +97,8 @@ class Warehouse(Construct):
             "RedshiftWorkgroup",
             workgroup_name=config.workgroup_name,
             namespace_name=config.namespace_name,
-            base_capacity=128,
-            max_capacity=512,
+            base_capacity=config.base_capacity,
+            max_capacity=config.max_capacity,
             enhanced_vpc_routing=False,
             security_group_ids=[self.security_group.security_group_id],
             subnet_ids=[
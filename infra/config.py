@@ -26,16 +26,40 @@ class RedshiftConfig(BaseModel):
     admin_username: str
     admin_password: str
     removal_policy: str
+    #: Redshift Processing Units the workgroup runs with, and scales up to
+    base_capacity: int = 128
+    max_capacity: int = 512
+
+
+class JobProfile(BaseModel):
+    vcpus: float
+    memory_mib: int
+    #: Fargate task storage, 21 GiB is the minimum and the default
+    ephemeral_storage_gib: int = 21
+
+
+class JobQueueConfig(BaseModel):
+    name: str
+    #: Higher priority queues are scheduled first
+    priority: int
+    #: Run on Fargate Spot first, spilling over to on-demand Fargate
+    spot: bool
 
 
 class BatchConfig(BaseModel):
     name: str
-    queue_name: str
+    queues: list[JobQueueConfig]
+    #: On-demand Fargate vCPUs
     max_vcpus: int
-    min_vcpus: int
-    desired_vcpus: int
-    instance_types: list[str]
+    #: Fargate Spot vCPUs, used before max_vcpus by spot queues
+    spot_max_vcpus: int
+    #: Attempts of a job interrupted by a Fargate Spot reclaim
+    spot_retry_attempts: int
     removal_policy: str
+    #: Resources a job runs with, each one registered as <job>-<profile>
+    profiles: dict[str, JobProfile]
+    #: Profile of the plain <job> definitions, used when a run doesn't pick one
+    default_profile: str
 
 
 class Config(BaseModel):
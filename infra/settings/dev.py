@@ -23,11 +23,19 @@ config = {
     },
     "batch": {
         "name": "dpstack-batch",
-        "queue_name": "dpstack-batch-queue",
+        "queues": [
+            {"name": "dpstack-batch-queue", "priority": 10, "spot": True},
+            {"name": "dpstack-batch-ondemand-queue", "priority": 20, "spot": False},
+        ],
         "max_vcpus": 4,
-        "min_vcpus": 0,
-        "desired_vcpus": 0,
-        "instance_types": ["optimal"],
+        "spot_max_vcpus": 16,
+        "spot_retry_attempts": 3,
         "removal_policy": "DESTROY",
+        "profiles": {
+            "small": {"vcpus": 0.5, "memory_mib": 1024},
+            "medium": {"vcpus": 1, "memory_mib": 2048},
+            "large": {"vcpus": 4, "memory_mib": 16384, "ephemeral_storage_gib": 50},
+        },
+        "default_profile": "medium",
     },
 }
@@ -35,4 +35,6 @@ class DataPlatform(Stack):
             "ComputeJob",
             self.dbt_image.repository,
             self.ingestion_image.repository,
+            config.batch,
+            redshift_slices=config.redshift.base_capacity,
         )
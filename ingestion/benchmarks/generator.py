@@ -0,0 +1,168 @@
+"""Generate synthetic launch documents shaped like the SpaceX API dump.
+
+Run from the ingestion directory:
+
+    python benchmarks/generator.py --launches 1000000 --files 10 --out /tmp/raw
+
+Launches keep the field set and nesting of data/spacex.json: one core per
+launch or three for a heavy rocket, zero to a few payloads, and a failure
+entry for unsuccessful launches. Output is deterministic for a given seed.
+"""
+
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+#: Rocket id -> (cores per launch, share of launches)
+ROCKETS = {
+    "5e9d0d95eda69955f709d1eb": (1, 0.03),  #: Falcon 1
+    "5e9d0d95eda69973a809d1ec": (1, 0.94),  #: Falcon 9
+    "5e9d0d95eda69974db09d1ed": (3, 0.03),  #: Falcon Heavy
+}
+LAUNCHPADS = [f"5e9e4501f5090910d4566f{i:02x}" for i in range(4)]
+LANDPADS = [f"5e9e3032383ecb267a34e7{i:02x}" for i in range(8)]
+LANDING_TYPES = ["ASDS", "RTLS", "Ocean"]
+FAILURE_REASONS = ["merlin engine failure", "residual stage-1 thrust", "helium tank"]
+START = datetime(2006, 3, 24, tzinfo=timezone.utc)
+
+
+def object_id(rng: random.Random) -> str:
+    """A 24 hex digit id like the Mongo ids used by the API"""
+
+    return f"{rng.getrandbits(96):024x}"
+
+
+def generate_core(rng: random.Random, core_ids: list[str]) -> dict:
+    if rng.random() < 0.1:
+        #: Unknown cores are all nulls in the API
+        return dict.fromkeys(
+            [
+                "core",
+                "flight",
+                "gridfins",
+                "legs",
+                "reused",
+                "landing_attempt",
+                "landing_success",
+                "landing_type",
+                "landpad",
+            ]
+        )
+
+    landing_attempt = rng.random() < 0.8
+    return {
+        "core": rng.choice(core_ids),
+        "flight": rng.randint(1, 15),
+        "gridfins": landing_attempt,
+        "legs": landing_attempt,
+        "reused": rng.random() < 0.6,
+        "landing_attempt": landing_attempt,
+        "landing_success": (rng.random() < 0.95) if landing_attempt else None,
+        "landing_type": rng.choice(LANDING_TYPES) if landing_attempt else None,
+        "landpad": rng.choice(LANDPADS) if landing_attempt else None,
+    }
+
+
+def generate_launch(rng: random.Random, flight_number: int, core_ids) -> dict:
+    rocket = rng.choices(list(ROCKETS), [share for _, share in ROCKETS.values()])[0]
+    date_utc = START + timedelta(seconds=rng.randint(0, 24 * 365 * 24 * 3600))
+    offset = timezone(timedelta(hours=rng.choice([-8, -5, 0, 5, 12])))
+    upcoming = date_utc > datetime(2022, 12, 1, tzinfo=timezone.utc)
+    success = None if upcoming else rng.random() < 0.97
+
+    return {
+        "fairings": {
+            "reused": rng.random() < 0.3,
+            "recovery_attempt": rng.random() < 0.4,
+            "recovered": rng.random() < 0.3,
+            "ships": [],
+        },
+        "links": {
+            "patch": {"small": None, "large": None},
+            "reddit": dict.fromkeys(["campaign", "launch", "media", "recovery"]),
+            "flickr": {"small": [], "original": []},
+            "presskit": None,
+            "webcast": None,
+            "youtube_id": None,
+            "article": None,
+            "wikipedia": None,
+        },
+        "static_fire_date_utc": None,
+        "static_fire_date_unix": None,
+        "net": False,
+        "window": rng.choice([0, 0, 3600, None]),
+        "rocket": rocket,
+        "success": success,
+        "failures": (
+            [
+                {
+                    "time": rng.randint(1, 600),
+                    "altitude": rng.choice([None, rng.randint(1, 300)]),
+                    "reason": rng.choice(FAILURE_REASONS),
+                }
+            ]
+            if success is False
+            else []
+        ),
+        "details": None,
+        "crew": [],
+        "ships": [object_id(rng) for _ in range(rng.choice([0, 0, 1, 3]))],
+        "capsules": [],
+        "payloads": [
+            object_id(rng) for _ in range(rng.choices([0, 1, 2, 3], [6, 88, 5, 1])[0])
+        ],
+        "launchpad": rng.choice(LAUNCHPADS),
+        "flight_number": flight_number,
+        "name": f"Synthetic {flight_number}",
+        "date_utc": date_utc.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "date_unix": int(date_utc.timestamp()),
+        "date_local": date_utc.astimezone(offset).isoformat(),
+        "date_precision": "hour",
+        "upcoming": upcoming,
+        "cores": [generate_core(rng, core_ids) for _ in range(ROCKETS[rocket][0])],
+        "auto_update": True,
+        "tbd": False,
+        "launch_library_id": None,
+        "id": object_id(rng),
+    }
+
+
+def generate_launches(count: int, seed: int = 0) -> list[dict]:
+    """count synthetic launches, reusing each core id for ~10 launches"""
+
+    rng = random.Random(seed)
+    core_ids = [object_id(rng) for _ in range(max(1, count // 10))]
+    return [generate_launch(rng, number, core_ids) for number in range(1, count + 1)]
+
+
+def write_raw(out: str, launches: int, files: int = 1, seed: int = 0) -> list[str]:
+    """Write launches split evenly across JSON array files under out"""
+
+    os.makedirs(out, exist_ok=True)
+    paths = []
+    per_file = -(-launches // files)
+    for index in range(files):
+        count = max(0, min(per_file, launches - index * per_file))
+        path = os.path.join(out, f"spacex-{index:05d}.json")
+        with open(path, "w") as f:
+            json.dump(generate_launches(count, seed + index), f)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--launches", type=int, required=True)
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    for path in write_raw(args.out, args.launches, args.files, args.seed):
+        print(f"✅ Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Check module import times against a budget using python -X importtime.
+
+Run from the ingestion directory:
+
+    python benchmarks/import_time.py
+
+Every module is imported in a fresh interpreter, best of --repeat runs, and
+the script exits non-zero if any cumulative import time exceeds its budget.
+Importing must not need AWS credentials or network access.
+"""
+
+import argparse
+import subprocess
+import sys
+
+#: Cumulative import time budget per module, in milliseconds
+BUDGETS_MS = {
+    "utils.catalog": 150,
+    "spacex.transformation": 2500,
+    "spacex.ingest": 2500,
+}
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative import time of a module in a fresh interpreter"""
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    #: Lines look like "import time: self [us] | cumulative | imported package"
+    for line in reversed(process.stderr.splitlines()):
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+
+    raise ValueError(f"No import time reported for {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    over_budget = []
+    for module, budget in BUDGETS_MS.items():
+        elapsed = min(import_time_ms(module) for _ in range(args.repeat))
+        if elapsed > budget:
+            over_budget.append(module)
+            print(f"❌ {module}: {elapsed:.0f} ms (budget {budget} ms)")
+        else:
+            print(f"✅ {module}: {elapsed:.0f} ms (budget {budget} ms)")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark JSON decoding of raw launches: pandas versus the Arrow path.
+
+Run from the ingestion directory:
+
+    python -m benchmarks.json_decode --launches 10000 100000
+
+Compares pandas.read_json on a JSON array (what wr.s3.read_json does) with
+utils.json_reader on the same array and on newline-delimited JSON, using the
+raw_spacex read schema. Each measurement runs in a fresh process.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+from benchmarks.generator import generate_launches
+from benchmarks.run import PeakRss, run_in_child
+from utils.catalog import catalog
+from utils.json_reader import read_json_batches
+
+
+def decode_pandas(path: str) -> pd.DataFrame:
+    return pd.read_json(path)
+
+
+def decode_arrow(path: str) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        batches = read_json_batches(
+            f, path.endswith(".jsonl"), catalog.get("raw_spacex").read_schema
+        )
+        return pd.concat(
+            [batch.to_pandas(types_mapper=pd.ArrowDtype) for batch in batches],
+            ignore_index=True,
+        )
+
+
+DECODERS = {
+    "pandas array": (decode_pandas, "launches.json"),
+    "arrow array": (decode_arrow, "launches.json"),
+    "arrow lines": (decode_arrow, "launches.jsonl"),
+}
+
+
+def write_samples(workdir: str, launches: int):
+    records = generate_launches(launches)
+    with open(os.path.join(workdir, "launches.json"), "w") as f:
+        json.dump(records, f)
+    with open(os.path.join(workdir, "launches.jsonl"), "w") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def _measure(name: str, path: str, results):
+    decode, _ = DECODERS[name]
+    with PeakRss() as memory:
+        start = time.perf_counter()
+        df = decode(path)
+        elapsed = time.perf_counter() - start
+    results.put((len(df.index), elapsed, memory.peak / 2**20))
+
+
+def measure(name: str, path: str) -> tuple:
+    return run_in_child(_measure, name, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--launches", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'decoder':<14}{'launches':>10}{'MiB':>8}{'seconds':>9}{'peak MiB':>10}")
+    for launches in args.launches:
+        with tempfile.TemporaryDirectory() as workdir:
+            write_samples(workdir, launches)
+            for name, (_, filename) in DECODERS.items():
+                path = os.path.join(workdir, filename)
+                rows, elapsed, peak = measure(name, path)
+                size = os.path.getsize(path) / 2**20
+                print(f"{name:<14}{rows:>10}{size:>8.0f}{elapsed:>9.2f}{peak:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
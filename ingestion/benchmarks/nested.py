@@ -0,0 +1,89 @@
+"""Benchmark map_cores flattening against explode + json_normalize.
+
+Run from the ingestion directory:
+
+    python -m benchmarks.nested --scales 10 100 1000
+
+Each measurement runs in a fresh process so peak RSS is not shared between
+implementations or scales.
+"""
+
+import argparse
+import time
+
+import pandas as pd
+from benchmarks.run import PeakRss, run_in_child
+from utils.nested import explode_structs
+
+SAMPLE_PATH = "data/spacex.json"
+
+
+def legacy_map_cores(df: pd.DataFrame) -> pd.DataFrame:
+    """map_cores before the columnar flattening engine"""
+
+    df = df[["id", "cores"]].copy()
+    exploded = df.explode("cores")
+    cores_flat = pd.json_normalize(exploded["cores"])
+    cores_flat.insert(0, "parent_id", exploded["id"].values)
+
+    return cores_flat
+
+
+def columnar_map_cores(df: pd.DataFrame) -> pd.DataFrame:
+    """map_cores on the columnar flattening engine"""
+
+    return explode_structs(df, "cores", keep={"id": "parent_id"})
+
+
+IMPLEMENTATIONS = {"legacy": legacy_map_cores, "columnar": columnar_map_cores}
+
+
+def load_sample(scale: int) -> pd.DataFrame:
+    """The bundled SpaceX dump repeated scale times"""
+
+    sample = pd.read_json(SAMPLE_PATH)
+    return pd.concat([sample] * scale, ignore_index=True)
+
+
+def _measure(name: str, scale: int, results):
+    df = load_sample(scale)
+    with PeakRss() as memory:
+        start = time.perf_counter()
+        cores = IMPLEMENTATIONS[name](df)
+        elapsed = time.perf_counter() - start
+    results.put((len(df.index), len(cores.index), elapsed, memory.peak / 2**20))
+
+
+def measure(name: str, scale: int) -> dict:
+    """Run one implementation at one scale in a child process"""
+
+    launches, cores, elapsed, peak_mib = run_in_child(_measure, name, scale)
+
+    return {
+        "implementation": name,
+        "scale": scale,
+        "launches": launches,
+        "cores": cores,
+        "seconds": elapsed,
+        "rows_per_second": launches / elapsed,
+        "peak_rss_mib": peak_mib,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'impl':<10}{'scale':>7}{'launches':>10}{'rows/s':>12}{'peak MiB':>10}")
+    for scale in args.scales:
+        for name in IMPLEMENTATIONS:
+            r = measure(name, scale)
+            print(
+                f"{r['implementation']:<10}{r['scale']:>7}{r['launches']:>10}"
+                f"{r['rows_per_second']:>12,.0f}{r['peak_rss_mib']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
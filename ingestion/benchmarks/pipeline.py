@@ -0,0 +1,107 @@
+"""Run transformation -> ingest end to end on local stand-ins and time each stage.
+
+Run from the ingestion directory, with requirements-local.txt installed:
+
+    python -m benchmarks.pipeline --launches 1000 10000 100000
+
+S3 is a moto server and Redshift a DuckDB file, so no AWS account is used.
+The raw dataset is made by benchmarks/generator.py. Each size runs in a
+fresh process against empty storage and an empty warehouse.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.run import run_in_child
+
+BUCKET = "dpstack-dlake"
+
+
+def start_local_stack(workdir: str):
+    """Start a moto S3 server and point storage and warehouse at local stand-ins"""
+
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    _, port = server.get_host_and_port()
+
+    #: Honoured by every boto3 client, including the ones awswrangler creates
+    os.environ["AWS_ENDPOINT_URL_S3"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "eu-west-1")
+    os.environ["WAREHOUSE_BACKEND"] = "duckdb"
+    os.environ["DUCKDB_DATABASE"] = os.path.join(workdir, "warehouse.duckdb")
+
+    import boto3
+
+    boto3.client("s3").create_bucket(
+        Bucket=BUCKET,
+        CreateBucketConfiguration={
+            "LocationConstraint": os.environ["AWS_DEFAULT_REGION"]
+        },
+    )
+
+    return server
+
+
+def seed_raw(launches: int):
+    """Upload synthetic launches to the raw prefix"""
+
+    import boto3
+    from benchmarks.generator import generate_launches
+
+    boto3.client("s3").put_object(
+        Bucket=BUCKET,
+        Key="raw/spacex.json",
+        Body=json.dumps(generate_launches(launches)),
+    )
+
+
+def _run(launches: int, results):
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_local_stack(workdir)
+        try:
+            seed_raw(launches)
+
+            from spacex import ingest, transformation
+
+            timings = {}
+            for stage, run in (
+                ("transformation", transformation.main),
+                ("ingest", ingest.main),
+            ):
+                start = time.perf_counter()
+                run()
+                timings[stage] = time.perf_counter() - start
+
+            results.put({"launches": launches, **timings})
+        finally:
+            server.stop()
+
+
+def run_pipeline(launches: int) -> dict:
+    """Run the whole pipeline on one data size in a child process"""
+
+    return run_in_child(_run, launches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--launches", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'launches':>10}{'transform s':>13}{'ingest s':>10}")
+    for launches in args.launches:
+        r = run_pipeline(launches)
+        print(f"{r['launches']:>10}{r['transformation']:>13.2f}{r['ingest']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
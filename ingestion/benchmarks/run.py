@@ -0,0 +1,238 @@
+"""Benchmark the pipeline stages on synthetic data and record the results.
+
+Run from the ingestion directory, with requirements-local.txt installed:
+
+    python -m benchmarks.run --launches 10000 100000 --output results.json
+    python -m benchmarks.run --launches 10000 100000 --compare results.json
+
+Stages are transform_data in memory, Dataset.write of both stage datasets to
+a local moto S3, and load_data_to_redshift into the DuckDB stand-in. Each
+records throughput, peak RSS growth and output size. --compare exits
+non-zero when throughput drops or peak memory grows by more than --threshold
+against a previous results file, e.g. one written on the main branch.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakRss:
+    """Track the peak resident memory growth of the process while active"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    @staticmethod
+    def rss() -> int:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+
+    def _sample(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, self.rss() - self.start)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.start = self.rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss() - self.start)
+
+
+def run_in_child(target, *args):
+    """Call target(*args, results) in a fresh spawned process and return what
+    it puts on the results queue, raising if the child exits without one,
+    e.g. on an import error or when killed for running out of memory"""
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=target, args=(*args, results))
+    process.start()
+    try:
+        while True:
+            #: Checked before waiting, a result put before exiting is still read
+            alive = process.is_alive()
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                if not alive:
+                    raise RuntimeError(
+                        f"{target.__name__} exited with code {process.exitcode} "
+                        "without a result"
+                    )
+    except BaseException:
+        process.terminate()
+        raise
+    finally:
+        process.join()
+
+
+def _measure(stage: str, launches: int, run) -> dict:
+    """Run one stage, run returns (rows processed, output bytes)"""
+
+    with PeakRss() as memory:
+        start = time.perf_counter()
+        rows, output_bytes = run()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "stage": stage,
+        "launches": launches,
+        "rows": int(rows),
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed,
+        "peak_rss_mib": memory.peak / 2**20,
+        "output_bytes": int(output_bytes),
+    }
+
+
+def _run(launches: int, results):
+    import pandas as pd
+    from benchmarks.generator import generate_launches
+    from benchmarks.pipeline import start_local_stack
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_local_stack(workdir)
+        try:
+            import awswrangler as wr
+            from spacex import ingest
+            from spacex.transformation import transform_data
+            from utils.catalog import catalog
+
+            raw = pd.DataFrame(generate_launches(launches))
+            stages = {"launches_stage": "launches", "cores_stage": "cores"}
+            frames = {}
+
+            def transform():
+                frames.update(zip(stages, transform_data(raw)))
+                return launches, sum(
+                    df.memory_usage(deep=True).sum() for df in frames.values()
+                )
+
+            def write():
+                written = []
+                for name, df in frames.items():
+                    written += catalog.get(name).write(df)
+                sizes = wr.s3.size_objects(written)
+                return sum(len(df.index) for df in frames.values()), sum(sizes.values())
+
+            def load():
+                ingest.create_schema("src_spacex")
+                rows = sum(
+                    ingest.load_data_to_redshift(catalog.get(name), table, "src_spacex")
+                    for name, table in stages.items()
+                )
+                ingest.get_pool().close()
+                return rows, os.path.getsize(os.environ["DUCKDB_DATABASE"])
+
+            results.put(
+                [
+                    _measure("transform", launches, transform),
+                    _measure("write", launches, write),
+                    _measure("load", launches, load),
+                ]
+            )
+        finally:
+            server.stop()
+
+
+def run_benchmark(launches: int) -> list[dict]:
+    """Benchmark every stage on one data size in a child process"""
+
+    return run_in_child(_run, launches)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> bool:
+    """Print the change against a baseline and return whether it regressed"""
+
+    previous = {(r["stage"], r["launches"]): r for r in baseline}
+    regressed = False
+
+    for r in results:
+        before = previous.get((r["stage"], r["launches"]))
+        if before is None:
+            continue
+
+        speed = r["rows_per_second"] / before["rows_per_second"] - 1
+        memory = (r["peak_rss_mib"] + 1) / (before["peak_rss_mib"] + 1) - 1
+        worse = speed < -threshold or memory > threshold
+        regressed |= worse
+
+        print(
+            f"{'❌' if worse else '✅'} {r['stage']:<10}{r['launches']:>10}"
+            f"  rows/s {speed:+.0%}  peak memory {memory:+.0%}"
+        )
+
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--launches", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Previous results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = [r for launches in args.launches for r in run_benchmark(launches)]
+
+    print(
+        f"{'stage':<10}{'launches':>10}{'rows':>10}{'rows/s':>12}"
+        f"{'peak MiB':>10}{'output MiB':>12}"
+    )
+    for r in results:
+        print(
+            f"{r['stage']:<10}{r['launches']:>10}{r['rows']:>10}"
+            f"{r['rows_per_second']:>12,.0f}{r['peak_rss_mib']:>10.1f}"
+            f"{r['output_bytes'] / 2**20:>12.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
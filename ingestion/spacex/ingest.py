@@ -1,38 +1,54 @@
-import awswrangler as wr
+import argparse
+import os
+from functools import partial
+
 from utils.catalog import catalog
 from utils.dataset import Dataset
-
-
-connection = wr.redshift.connect(secret_id="dpstack-admin-secret")
+from utils.loader import LoadScheduler
+from utils.warehouse import get_pool, get_warehouse
 
 
 def create_schema(schema: str):
     """Create a schema in Redshift"""
 
-    with connection.cursor() as cursor:
-        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
-        connection.commit()
+    with get_pool().connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            connection.commit()
 
 
-def load_data_to_redshift(dataset: Dataset, table: str, schema: str):
-    """Load data to Redshift"""
+def load_data_to_redshift(dataset: Dataset, table: str, schema: str, con=None) -> int:
+    """Load data to Redshift, or the configured stand-in, and return the
+    number of rows loaded"""
 
-    wr.redshift.copy_from_files(
-        path=dataset.path,
-        table=table,
-        schema=schema,
-        data_format=dataset.format,
-        con=connection,
-        mode="overwrite",
-        overwrite_method="drop",
-    )
+    load = partial(get_warehouse().load, dataset=dataset, table=table, schema=schema)
+    return load(con) if con else get_pool().run(load)
 
 
-def main():
+def main(names: list[str] | None = None):
+    """Load stage datasets to their tables, every dataset transformed from
+    raw_spacex by default. The loads are independent of each other."""
+
+    datasets = [catalog.get(name) for name in names or catalog.downstream("raw_spacex")]
     create_schema("src_spacex")
-    load_data_to_redshift(catalog.get("launches_stage"), "launches", "src_spacex")
-    load_data_to_redshift(catalog.get("cores_stage"), "cores", "src_spacex")
+
+    scheduler = LoadScheduler(
+        get_pool(), max_workers=int(os.getenv("LOAD_CONCURRENCY", "4"))
+    )
+    try:
+        scheduler.run(
+            {
+                dataset.table: partial(
+                    load_data_to_redshift, dataset, dataset.table, "src_spacex"
+                )
+                for dataset in datasets
+            }
+        )
+    finally:
+        get_pool().close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load SpaceX stage datasets")
+    parser.add_argument("datasets", nargs="*", help="Stage datasets, default all")
+    main(parser.parse_args().datasets)
@@ -1,12 +1,41 @@
-from utils.catalog import catalog
+import argparse
+import multiprocessing
+import os
+import signal
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Iterator
+
+import awswrangler as wr
 import pandas as pd
 
+from utils.catalog import catalog
+from utils.nested import explode_structs
+
+
+def add_launch_period(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the launch year and month the stage datasets are partitioned by"""
+
+    date_utc = pd.to_datetime(df["date_utc"], utc=True)
+    return df.assign(launch_year=date_utc.dt.year, launch_month=date_utc.dt.month)
+
 
 def map_launches(df: pd.DataFrame) -> pd.DataFrame:
     """Map launches data to a DataFrame"""
 
-    launches = df[["id", "name", "date_local", "rocket", "success", "date_utc"]].copy()
-    launches.astype({"id": "string", "success": "bool"})
+    launches = df[
+        [
+            "id",
+            "name",
+            "date_local",
+            "rocket",
+            "success",
+            "date_utc",
+            "launch_year",
+            "launch_month",
+        ]
+    ].copy()
 
     return launches
 
@@ -14,33 +43,192 @@ def map_launches(df: pd.DataFrame) -> pd.DataFrame:
 def map_cores(df: pd.DataFrame) -> pd.DataFrame:
     """Map cores data to a DataFrame"""
 
-    df = df[["id", "cores"]].copy()
-    exploded = df.explode("cores")
-    cores_flat = pd.json_normalize(exploded["cores"])
-    cores_flat.insert(0, "parent_id", exploded["id"].values)
-
-    return cores_flat
+    return explode_structs(
+        df,
+        "cores",
+        keep={
+            "id": "parent_id",
+            "launch_year": "launch_year",
+            "launch_month": "launch_month",
+        },
+        position="core_index",
+    )
 
 
 def transform_data(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Transform data to a DataFrame"""
 
+    df = add_launch_period(df)
     launches = map_launches(df)
     cores = map_cores(df)
 
     return launches, cores
 
 
-def main():
-    """Main function"""
+#: Set by SIGTERM, checked between chunks
+stopping = False
+
+
+class Stopped(Exception):
+    """The job was stopped before finishing an object"""
+
+
+def _stop(signum, frame):
+    """Batch stops a job, on a Spot reclaim too, with SIGTERM and then SIGKILL
+    once the stop timeout runs out. Finish the chunk being written instead of
+    exiting mid write, so every stage file written is known and either
+    recorded or deleted, and a retry of the job finds no partial output."""
+
+    global stopping
+    stopping = True
+    for child in multiprocessing.active_children():
+        child.terminate()
+
+
+def handle_sigterm():
+    signal.signal(signal.SIGTERM, _stop)
+
+
+def transform_object(path: str) -> dict[str, list[str]]:
+    """Transform one raw object and return the stage files written from it"""
+
+    raw_spacex = catalog.get("raw_spacex")
+    launches_stage = catalog.get("launches_stage")
+    cores_stage = catalog.get("cores_stage")
+    outputs = {launches_stage.name: [], cores_stage.name: []}
+
+    try:
+        #: Process the object in bounded chunks so memory stays flat
+        for chunk in raw_spacex.iter_chunks(paths=[path]):
+            if stopping:
+                raise Stopped(f"Stopped before finishing {path}")
+            launches, cores = transform_data(chunk)
+
+            #: Published with the whole run by publish_stage
+            outputs[launches_stage.name] += launches_stage.write(
+                launches, "append", publish=False
+            )
+            outputs[cores_stage.name] += cores_stage.write(
+                cores, "append", publish=False
+            )
+    except Exception:
+        #: Don't leave the partial output of a failed or stopped object behind
+        wr.s3.delete_objects([p for paths in outputs.values() for p in paths])
+        raise
+
+    return outputs
+
+
+def transform_objects(paths: list[str], workers: int) -> Iterator[tuple]:
+    """Transform raw objects, in worker processes when workers > 1, and
+    yield (path, outputs or exception) as each one finishes"""
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, transform_object(path)
+            except Exception as e:
+                yield path, e
+        return
+
+    #: spawn, as forking a process that already runs boto3 threads isn't safe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=handle_sigterm
+    ) as pool:
+        futures = {pool.submit(transform_object, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def in_shard(path: str, shard: int, shards: int) -> bool:
+    """Whether a raw object belongs to this shard, stable across runs"""
+
+    return zlib.crc32(path.encode()) % shards == shard
+
 
-    raw_spacex = catalog.get("raw_spacex").read()
+def publish_stage(manifest, collect_garbage: bool = False):
+    """Publish a version of each snapshot stage dataset made of exactly the
+    files the raw manifest records for it.
 
-    launches, cores = transform_data(raw_spacex)
+    Published after the manifest is saved and derived from it, so a run that
+    stops in between is made good by the next one, and a version never lists
+    files of a replaced or unrecorded object.
+    """
 
-    catalog.get("launches_stage").write(launches)
-    catalog.get("cores_stage").write(cores)
+    for name in catalog.downstream("raw_spacex"):
+        dataset = catalog.get(name)
+        if dataset.snapshot is None:
+            continue
+        #: Reloaded on every attempt, a concurrent shard may have published
+        dataset.snapshot.publish(partial(stage_files, manifest, name))
+        if collect_garbage:
+            dataset.snapshot.collect_garbage()
+
+
+def stage_files(manifest, name: str) -> list[str]:
+    return manifest.reload().dataset_outputs(name)
+
+
+def main(shard: int = 0, shards: int = 1, backfill: bool = False):
+    """Transform the pending raw objects of one shard, all of them by default.
+    A backfill transforms every raw object of the shard again."""
+
+    raw_spacex = catalog.get("raw_spacex")
+    manifest = raw_spacex.manifest
+
+    #: Nothing tracked yet, start the stage datasets from scratch. Only when
+    #: unsharded, a shard can't tell whether the others already wrote output
+    if not manifest.entries and shards == 1 and not backfill:
+        catalog.get("launches_stage").delete()
+        catalog.get("cores_stage").delete()
+
+    #: Only raw objects that are new or changed since the last run are read
+    objects = raw_spacex.list_versions() if backfill else raw_spacex.pending_objects()
+    pending = {
+        path: version
+        for path, version in objects.items()
+        if in_shard(path, shard, shards)
+    }
+    workers = int(os.getenv("TRANSFORM_WORKERS", os.cpu_count() or 1))
+
+    handle_sigterm()
+    errors = []
+    for path, result in transform_objects(list(pending), min(workers, len(pending))):
+        if isinstance(result, Exception):
+            print(f"❌ Error transforming {path}: {str(result)}")
+            errors.append(result)
+            continue
+
+        #: Upsert: replace what the previous version of this object produced.
+        #: Snapshot datasets leave it out of their next version instead, as
+        #: loads may still read the current one
+        for name, outputs in manifest.outputs(path).items():
+            if catalog.get(name).snapshot is None:
+                wr.s3.delete_objects(outputs)
+        manifest.record(path, pending[path], result)
+
+    #: Commit every object that succeeded in a single manifest write, after a
+    #: stop too, so a retry skips them
+    manifest.save()
+    publish_stage(manifest, collect_garbage=shard == 0)
+
+    if errors:
+        raise errors[0]
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Transform raw SpaceX objects")
+    #: Children of a Batch array job each take the shard of their index
+    parser.add_argument(
+        "--shard", type=int, default=int(os.getenv("AWS_BATCH_JOB_ARRAY_INDEX", "0"))
+    )
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument(
+        "--backfill", action="store_true", help="Transform processed objects again"
+    )
+    args = parser.parse_args()
+    main(args.shard, args.shards, args.backfill)
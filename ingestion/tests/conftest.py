@@ -0,0 +1,42 @@
+import awswrangler as wr
+import pandas as pd
+import pytest
+from benchmarks.pipeline import BUCKET, start_local_stack
+from utils.dataset import Dataset
+
+
+@pytest.fixture(scope="session")
+def local_stack(tmp_path_factory):
+    """moto S3 server shared by the tests, see benchmarks/pipeline.py"""
+
+    server = start_local_stack(str(tmp_path_factory.mktemp("stack")))
+    yield
+    server.stop()
+
+
+@pytest.fixture
+def bucket(local_stack) -> str:
+    """Path of the test bucket, emptied after each test"""
+
+    yield f"s3://{BUCKET}/"
+    wr.s3.delete_objects(f"s3://{BUCKET}/")
+
+
+@pytest.fixture
+def launches(bucket) -> Dataset:
+    """Snapshot Parquet dataset keyed by id, like the stage datasets"""
+
+    return Dataset(
+        "launches",
+        f"{bucket}stage/launches/",
+        format="parquet",
+        primary_keys=["id"],
+        schema={"id": "string", "name": "string", "flight": "int"},
+        snapshots=True,
+    )
+
+
+def frame(ids: range) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"id": [f"l{i}" for i in ids], "name": [f"launch {i}" for i in ids]}
+    ).assign(flight=list(ids))
@@ -0,0 +1,68 @@
+import io
+import json
+
+import pyarrow as pa
+import pytest
+from utils import json_reader
+from utils.json_reader import read_json_batches
+
+LAUNCHES = [
+    {"id": "1", "name": 'quoted "name", with [brackets] and {braces}'},
+    {
+        "id": "2",
+        "name": "escaped backslash \\",
+        "cores": [{"core": "b1", "legs": True}],
+    },
+    {"id": "3", "name": 'escaped \\"quote\\" ]}', "cores": []},
+    {"id": "4", "name": "line\nbreak", "cores": [{"core": None}, {"core": "b2"}]},
+]
+
+
+def read(data: bytes, lines: bool, **kwargs) -> list[dict]:
+    batches = read_json_batches(io.BytesIO(data), lines, **kwargs)
+    return [row for batch in batches for row in batch.to_pylist()]
+
+
+@pytest.mark.parametrize("data", [b"", b" \n\t", b"[]", b" [\n ]\n"])
+def test_empty_array_or_file_has_no_batches(data):
+    assert read(data, lines=False) == []
+
+
+@pytest.mark.parametrize("data", [b"", b"\n\n", b"  \r\n"])
+def test_empty_lines_have_no_batches(data):
+    assert read(data, lines=True) == []
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("split_size", [1, 7, 2**20])
+def test_array_is_read_item_by_item(indent, split_size, monkeypatch):
+    monkeypatch.setattr(json_reader, "SPLIT_SIZE", split_size)
+    data = json.dumps(LAUNCHES, indent=indent).encode()
+
+    rows = read(data, lines=False)
+    assert [row["id"] for row in rows] == ["1", "2", "3", "4"]
+    assert [row["name"] for row in rows] == [launch["name"] for launch in LAUNCHES]
+    assert rows[3]["cores"] == [
+        {"core": None, "legs": None},
+        {"core": "b2", "legs": None},
+    ]
+
+
+def test_lines_are_read_in_batches_of_batch_rows():
+    data = b"".join(json.dumps(launch).encode() + b"\n" for launch in LAUNCHES)
+    batches = list(read_json_batches(io.BytesIO(data), True, batch_rows=3))
+
+    assert [batch.num_rows for batch in batches] == [3, 1]
+
+
+def test_schema_prunes_fields():
+    schema = pa.schema([("id", pa.string())])
+
+    assert read(json.dumps(LAUNCHES).encode(), False, schema=schema) == [
+        {"id": launch["id"]} for launch in LAUNCHES
+    ]
+
+
+def test_invalid_json_is_an_error():
+    with pytest.raises(pa.ArrowInvalid):
+        read(b'[{"id": "1"}, {"id": }]', lines=False)
@@ -0,0 +1,106 @@
+import json
+
+import awswrangler as wr
+import boto3
+import pandas as pd
+import pyarrow.parquet as pq
+from conftest import frame
+from utils import load_files
+from utils.dataset import s3_filesystem
+from utils.load_files import LoadFiles, plan_delta, removed_keys
+from utils.manifest import split_s3_path
+
+
+def read_manifest(path: str) -> dict[str, int]:
+    bucket, key = split_s3_path(path)
+    body = boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"].read()
+    return {
+        entry["url"]: entry["meta"]["content_length"]
+        for entry in json.loads(body)["entries"]
+    }
+
+
+def row_counts(paths) -> list[int]:
+    filesystem = s3_filesystem()
+    return [
+        pq.ParquetFile(
+            path.removeprefix("s3://"), filesystem=filesystem
+        ).metadata.num_rows
+        for path in paths
+    ]
+
+
+def test_manifest_after_keys_lists_only_split_files(launches, monkeypatch):
+    for start in range(0, 50, 10):
+        launches.write(frame(range(start, start + 10)), "append")
+    monkeypatch.setattr(load_files, "plan_file_count", lambda *_: 3)
+
+    files = LoadFiles(launches, slices=4)
+    keys = files.keys(frame(range(5))[["id"]])
+    entries = read_manifest(files.manifest(launches.snapshot.files()))
+
+    names = [path.rsplit("/", 1)[1] for path in entries]
+    assert names == ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet"]
+    assert keys not in entries
+    assert row_counts(entries) == [17, 17, 16]
+    assert all(size > 0 for size in entries.values())
+
+    files.cleanup()
+    assert not wr.s3.list_objects(f"{launches.path}_load/")
+
+
+def test_balanced_files_are_listed_as_they_are(launches, monkeypatch):
+    for start in range(0, 30, 10):
+        launches.write(frame(range(start, start + 10)), "append")
+    monkeypatch.setattr(load_files, "plan_file_count", lambda *_: 3)
+    published = launches.snapshot.files()
+
+    files = LoadFiles(launches, slices=4)
+    assert read_manifest(files.manifest(published)) == published
+    files.cleanup()
+
+
+def test_plan_delta_is_full_without_load_state(launches):
+    launches.write(frame(range(10)))
+
+    delta = plan_delta(launches, "src.launches", current=True)
+    assert delta.full
+    assert delta.added == launches.snapshot.files()
+    assert delta.version == launches.snapshot.current()[0]
+
+
+def test_plan_delta_is_full_for_a_table_to_replace(launches):
+    launches.write(frame(range(10)))
+    launches.snapshot.mark_loaded("src.launches", launches.snapshot.current()[0])
+
+    assert plan_delta(launches, "src.launches", current=False).full
+
+
+def test_plan_delta_applies_files_changed_since_loaded_version(launches):
+    kept = launches.write(frame(range(10)))
+    replaced = launches.write(frame(range(10, 20)), "append")
+    launches.snapshot.mark_loaded("src.launches", launches.snapshot.current()[0])
+    launches.delete(replaced)
+    added = launches.write(frame(range(10, 15)), "append")
+
+    delta = plan_delta(launches, "src.launches", current=True)
+    assert not delta.full
+    assert list(delta.added) == added
+    assert delta.removed == replaced
+    assert all(path in launches.snapshot.files() for path in kept)
+
+
+def test_plan_delta_is_empty_when_nothing_changed(launches):
+    launches.write(frame(range(10)))
+    launches.snapshot.mark_loaded("src.launches", launches.snapshot.current()[0])
+
+    assert plan_delta(launches, "src.launches", current=True).empty
+
+
+def test_removed_keys_are_distinct_replace_keys(launches):
+    launches.replace_keys = ["name"]
+    paths = launches.write(pd.concat([frame(range(5)), frame(range(3))]))
+
+    keys = removed_keys(launches, paths)
+    assert list(keys.columns) == ["name"]
+    assert sorted(keys["name"]) == [f"launch {i}" for i in range(5)]
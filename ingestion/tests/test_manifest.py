@@ -0,0 +1,29 @@
+from utils.manifest import Manifest, put_if_unchanged
+
+VERSION = {"etag": "e1", "last_modified": "2026-01-01T00:00:00+00:00"}
+
+
+def test_put_if_unchanged_refuses_a_stale_etag(bucket):
+    path = f"{bucket}manifests/test.json"
+
+    etag = put_if_unchanged(path, b"{}", None)
+    assert etag is not None
+    assert put_if_unchanged(path, b"{}", None) is None
+    assert put_if_unchanged(path, b'{"a": 1}', etag) is not None
+    assert put_if_unchanged(path, b"{}", etag) is None
+
+
+def test_concurrent_saves_keep_both_entries(bucket):
+    path = f"{bucket}manifests/raw.json"
+    first, second = Manifest(path), Manifest(path)
+    assert first.entries == second.entries == {}
+
+    first.record("s3://raw/a.json", VERSION, {"launches": ["a.parquet"]})
+    first.save()
+    second.record("s3://raw/b.json", VERSION, {"launches": ["b.parquet"]})
+    second.save()
+
+    saved = Manifest(path)
+    assert saved.is_processed("s3://raw/a.json", VERSION)
+    assert saved.is_processed("s3://raw/b.json", VERSION)
+    assert sorted(saved.dataset_outputs("launches")) == ["a.parquet", "b.parquet"]
@@ -0,0 +1,80 @@
+import pytest
+from utils.pool import ConnectionPool
+
+
+class Connection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    if connection.broken:
+        raise ConnectionError("broken")
+
+
+def pool(**kwargs) -> tuple[ConnectionPool, list[Connection]]:
+    opened = []
+
+    def connect():
+        opened.append(Connection())
+        return opened[-1]
+
+    return ConnectionPool(connect, health_check=check, **kwargs), opened
+
+
+def test_connections_are_reused():
+    connections, opened = pool()
+
+    connections.run(lambda connection: None)
+    connections.run(lambda connection: None)
+    assert len(opened) == 1
+
+
+def test_operation_is_retried_on_a_new_connection_when_it_broke():
+    connections, opened = pool()
+
+    def operation(connection):
+        if len(opened) == 1:
+            connection.broken = True
+            raise ConnectionError("lost")
+        return "done"
+
+    assert connections.run(operation) == "done"
+    assert len(opened) == 2
+    assert opened[0].closed
+
+
+def test_operation_failing_on_a_healthy_connection_is_not_retried():
+    connections, opened = pool()
+
+    def operation(connection):
+        raise ValueError("bad query")
+
+    with pytest.raises(ValueError):
+        connections.run(operation)
+    assert len(opened) == 1
+    assert not opened[0].closed
+
+
+def test_checkout_waits_at_most_timeout():
+    connections, _ = pool(max_size=1, timeout=0.01)
+
+    with connections.connection():
+        with pytest.raises(TimeoutError):
+            with connections.connection():
+                pass
+
+
+def test_stale_broken_connection_is_replaced():
+    connections, opened = pool(check_after=0)
+
+    with connections.connection() as connection:
+        pass
+    connection.broken = True
+    with connections.connection() as connection:
+        assert connection is opened[1]
+    assert opened[0].closed
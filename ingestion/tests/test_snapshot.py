@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import awswrangler as wr
+from conftest import frame
+from utils.manifest import put_if_unchanged
+from utils.snapshot import Snapshot
+
+
+def test_nothing_is_published_at_first(launches):
+    assert launches.snapshot.current() == (None, None)
+    assert launches.snapshot.files() is None
+    assert launches.published() is None
+
+
+def test_publish_lists_exactly_the_files(launches):
+    first = launches.write(frame(range(10)))
+    second = launches.write(frame(range(10, 20)), "append")
+
+    assert set(launches.published()) == set(first + second)
+    assert all(size > 0 for size in launches.snapshot.files().values())
+    assert len(launches.read().index) == 20
+
+
+def test_publishing_the_same_files_keeps_the_version(launches):
+    paths = launches.write(frame(range(10)))
+    version, _ = launches.snapshot.current()
+
+    assert launches.snapshot.publish(paths) == version
+
+
+def test_publish_retries_after_a_concurrent_publish(launches):
+    paths = launches.write(frame(range(10)))
+    other = Snapshot(launches.path)
+    _, etag = other.current()
+    #: Moves the pointer between the read and the conditional write
+    launches.snapshot.publish([])
+
+    assert put_if_unchanged(other.pointer_path, b"{}", etag) is None
+    other.publish(lambda: paths)
+    assert set(launches.published()) == set(paths)
+
+
+def test_collect_garbage_keeps_current_and_loaded_versions(launches):
+    oldest = launches.write(frame(range(10)))
+    loaded = launches.write(frame(range(10)))
+    launches.snapshot.mark_loaded("src.launches", launches.snapshot.current()[0])
+    current = launches.write(frame(range(10)))
+    snapshots = wr.s3.list_objects(f"{launches.path}_snapshots/")
+
+    assert launches.snapshot.collect_garbage(retention=timedelta(0)) == 2
+    remaining = wr.s3.list_objects(launches.path)
+    assert not set(oldest) & set(remaining)
+    assert set(loaded + current) <= set(remaining)
+    assert len(set(snapshots) & set(remaining)) == 2
+    assert launches.snapshot.loaded("src.launches") is not None
+
+
+def test_collect_garbage_keeps_recent_files(launches):
+    launches.write(frame(range(10)))
+    launches.write(frame(range(10)))
+
+    assert launches.snapshot.collect_garbage() == 0
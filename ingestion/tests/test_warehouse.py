@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+from conftest import frame
+from utils.dataset import Dataset
+from utils.warehouse import DuckDB
+
+
+@pytest.fixture
+def duckdb(tmp_path):
+    warehouse = DuckDB(str(tmp_path / "warehouse.duckdb"))
+    con = warehouse.connect()
+    con.execute("CREATE SCHEMA src")
+    yield warehouse, con
+    con.close()
+
+
+def columns(con, table: str) -> dict[str, str]:
+    return dict(
+        con.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = 'src' AND table_name = ? ORDER BY ordinal_position",
+            [table],
+        ).fetchall()
+    )
+
+
+def test_first_load_replaces_table_of_older_release(launches, duckdb):
+    warehouse, con = duckdb
+    con.execute("CREATE TABLE src.launches (id VARCHAR, name VARCHAR, date VARCHAR)")
+    con.execute("INSERT INTO src.launches VALUES ('old', 'old', '2006')")
+    launches.write(frame(range(10)))
+
+    assert warehouse.load(con, launches, "launches", "src") == 10
+    assert columns(con, "launches") == {
+        "id": "VARCHAR",
+        "name": "VARCHAR",
+        "flight": "BIGINT",
+    }
+    assert con.execute("SELECT count(*) FROM src.launches").fetchone() == (10,)
+
+
+def test_table_of_another_layout_is_replaced_despite_load_state(launches, duckdb):
+    warehouse, con = duckdb
+    launches.write(frame(range(10)))
+    warehouse.load(con, launches, "launches", "src")
+    con.execute("ALTER TABLE src.launches DROP COLUMN flight")
+    launches.write(frame(range(10, 15)), "append")
+
+    assert warehouse.load(con, launches, "launches", "src") == 15
+    assert "flight" in columns(con, "launches")
+
+
+def test_delta_load_removes_rows_of_unpublished_files(launches, duckdb):
+    warehouse, con = duckdb
+    launches.write(frame(range(10)))
+    replaced = launches.write(frame(range(10, 20)), "append")
+    warehouse.load(con, launches, "launches", "src")
+    launches.delete(replaced)
+    launches.write(frame(range(10, 15)), "append")
+
+    assert warehouse.load(con, launches, "launches", "src") == 5
+    assert warehouse.load(con, launches, "launches", "src") == 0
+    assert con.execute("SELECT count(*) FROM src.launches").fetchone() == (15,)
+
+
+def test_reloaded_parent_keeps_only_its_new_rows(bucket, duckdb):
+    warehouse, con = duckdb
+    cores = Dataset(
+        "cores",
+        f"{bucket}stage/cores/",
+        format="parquet",
+        primary_keys=["parent_id", "core_index"],
+        replace_keys=["parent_id"],
+        schema={"parent_id": "string", "core_index": "int"},
+        snapshots=True,
+    )
+    heavy = pd.DataFrame({"parent_id": ["l1"] * 3, "core_index": [0, 1, 2]})
+    written = cores.write(heavy)
+    warehouse.load(con, cores, "cores", "src")
+    cores.delete(written)
+    cores.write(heavy.head(1), "append")
+
+    warehouse.load(con, cores, "cores", "src")
+    assert con.execute("SELECT * FROM src.cores").fetchall() == [("l1", 0)]
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+
+import boto3
+from utils.manifest import split_s3_path
+
+DEFAULT_MAX_GB = 10
+#: Concurrent downloads, and bytes copied to disk at a time
+MAX_WORKERS = 16
+CHUNK_SIZE = 2**20
+
+
+class ObjectCache:
+    """S3 objects downloaded to a local directory, read through on a miss.
+
+    A copy is stored as <directory>/<bucket>/<key>.<etag>, so a changed object
+    is downloaded again and a copy is never stale. The key layout keeps hive
+    partition directories, which readers parse partition values from. Once
+    the copies add up to more than max_bytes, the least recently used ones
+    are deleted. Downloads land under a temporary name and are renamed into
+    place, so processes can share a directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._s3 = boto3.client("s3")
+
+    def local_path(self, path: str, etag: str) -> str:
+        bucket, key = split_s3_path(path)
+        return os.path.join(self.directory, bucket, f"{key}.{etag}")
+
+    def local_root(self, path: str) -> str:
+        """Local directory the copies of objects under path are stored in"""
+
+        bucket, prefix = split_s3_path(path)
+        return os.path.join(self.directory, bucket, prefix)
+
+    def etag(self, path: str) -> str:
+        """ETag of an object, with a HEAD request instead of a GET"""
+
+        bucket, key = split_s3_path(path)
+        return self._s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+
+    def _fetch(self, path: str, etag: str | None) -> str:
+        etag = etag or self.etag(path)
+        local = self.local_path(path, etag)
+
+        if os.path.exists(local):
+            #: Most recently used, so last to be evicted
+            os.utime(local)
+            return local
+
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        bucket, key = split_s3_path(path)
+        fd, partial = tempfile.mkstemp(dir=os.path.dirname(local), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                #: Fails instead of caching other content under this ETag if
+                #: the object changed since it was listed
+                response = self._s3.get_object(
+                    Bucket=bucket, Key=key, IfMatch=f'"{etag}"'
+                )
+                shutil.copyfileobj(response["Body"], f, CHUNK_SIZE)
+            os.replace(partial, local)
+        except BaseException:
+            os.remove(partial)
+            raise
+        return local
+
+    def get_many(self, etags: dict[str, str | None]) -> dict[str, str]:
+        """Local copies of objects, path -> ETag or None, downloading the
+        missing ones concurrently. A missing ETag is fetched with a HEAD."""
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            copies = dict(zip(etags, pool.map(self._fetch, etags, etags.values())))
+        self.evict(keep=set(copies.values()))
+        return copies
+
+    def evict(self, keep: set[str] = frozenset()):
+        """Delete the least recently used copies until they fit in max_bytes"""
+
+        copies = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".part"):
+                    continue
+                local = os.path.join(root, name)
+                try:
+                    stat = os.stat(local)
+                except FileNotFoundError:
+                    continue
+                copies.append((stat.st_mtime, stat.st_size, local))
+
+        total = sum(size for _, size, _ in copies)
+        for _, size, local in sorted(copies):
+            if total <= self.max_bytes:
+                break
+            if local in keep:
+                continue
+            try:
+                #: Readers that already opened the copy keep reading it
+                os.remove(local)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+@cache
+def get_cache() -> ObjectCache | None:
+    """Cache in DATASET_CACHE_DIR, of at most DATASET_CACHE_MAX_GB, or None
+    to read from S3 every time"""
+
+    directory = os.getenv("DATASET_CACHE_DIR")
+    if not directory:
+        return None
+
+    max_gb = float(os.getenv("DATASET_CACHE_MAX_GB", DEFAULT_MAX_GB))
+    return ObjectCache(directory, int(max_gb * 2**30))
@@ -1,15 +1,56 @@
+import os
+from functools import cached_property
+
 import yaml
-from utils.dataset import Dataset
 
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "catalog.yml"
+)
+
+
+class Catalog:
+    """Datasets declared in the catalog config.
+
+    Nothing is read at import time: the config is loaded on first access, from
+    CATALOG_PATH if set, and each Dataset is built once and then reused.
+    """
+
+    def __init__(self, config_path=None):
+        self._config_path = config_path
+        self._datasets = {}
+
+    @property
+    def config_path(self) -> str:
+        return self._config_path or os.getenv("CATALOG_PATH", DEFAULT_CONFIG_PATH)
+
+    @cached_property
+    def config(self) -> dict:
+        with open(self.config_path) as f:
+            return yaml.safe_load(f)
+
+    def downstream(self, source: str) -> list[str]:
+        """Names of the datasets transformed from source"""
+
+        return [
+            name
+            for name, config in self.config.items()
+            if config.get("source") == source
+        ]
+
+    def get(self, name):
+        if name not in self._datasets:
+            if name not in self.config:
+                raise KeyError(f"Dataset {name} is not in {self.config_path}")
+
+            #: Deferred so reading the config doesn't pay for pandas/awswrangler
+            from utils.dataset import Dataset
+
+            self._datasets[name] = Dataset(name, **self.config[name])
+        return self._datasets[name]
 
-def load_catalog(config_path="config/catalog.yml"):
-    with open(config_path) as f:
-        cfg = yaml.safe_load(f)
 
-    catalog = {}
-    for name, params in cfg.items():
-        catalog[name] = Dataset(name, **params)
-    return catalog
+def load_catalog(config_path=None) -> Catalog:
+    return Catalog(config_path)
 
 
 catalog = load_catalog()
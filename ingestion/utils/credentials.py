@@ -0,0 +1,46 @@
+import os
+import threading
+import time
+from functools import cache
+
+import awswrangler as wr
+
+DEFAULT_TTL_SECONDS = 300
+
+
+class SecretCache:
+    """Secrets Manager values kept for ttl seconds, shared by threads.
+
+    Connections opened within the ttl reuse the value instead of calling
+    Secrets Manager each time. A rotated secret is picked up once the value
+    expires, or right away after invalidate().
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS):
+        self.ttl = ttl
+        self._values: dict[str, tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret_id: str) -> dict:
+        """Secret value parsed from JSON, fetched if missing or expired"""
+
+        #: Held while fetching, so threads missing together fetch it once
+        with self._lock:
+            fetched, value = self._values.get(secret_id, (None, None))
+            if fetched is None or time.monotonic() - fetched > self.ttl:
+                value = wr.secretsmanager.get_secret_json(secret_id)
+                self._values[secret_id] = (time.monotonic(), value)
+            return value
+
+    def invalidate(self, secret_id: str):
+        """Fetch the secret again on next use, e.g. after a failed login"""
+
+        with self._lock:
+            self._values.pop(secret_id, None)
+
+
+@cache
+def get_secrets() -> SecretCache:
+    """Process wide cache, values kept for SECRET_CACHE_TTL seconds"""
+
+    return SecretCache(float(os.getenv("SECRET_CACHE_TTL", DEFAULT_TTL_SECONDS)))
@@ -1,31 +1,475 @@
+import os
+from functools import cache
+from typing import Iterator
+
 import awswrangler as wr
+import boto3
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pa_ds
+import pyarrow.fs as pa_fs
+from utils.cache import get_cache
+from utils.filters import Filters, filter_columns, filter_expression, filter_frame
+from utils.json_reader import read_json_batches
+from utils.manifest import Manifest, split_s3_path
+from utils.schema import apply_schema, arrow_schema
+from utils.snapshot import Snapshot, new_version
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+@cache
+def s3_filesystem() -> pa_fs.S3FileSystem:
+    """Arrow's own S3 client, for Parquet reads it filters itself"""
+
+    #: Arrow doesn't pick up the endpoint botocore reads from the environment
+    endpoint = os.getenv("AWS_ENDPOINT_URL_S3") or os.getenv("AWS_ENDPOINT_URL")
+    return pa_fs.S3FileSystem(endpoint_override=endpoint)
 
 
 class Dataset:
-    def __init__(self, name, path, format="csv"):
+    def __init__(
+        self,
+        name,
+        path,
+        format="csv",
+        chunk_rows=DEFAULT_CHUNK_ROWS,
+        manifest=None,
+        partition_cols=None,
+        compression="snappy",
+        row_group_size=None,
+        max_rows_by_file=None,
+        primary_keys=None,
+        schema=None,
+        engine="pandas",
+        read_schema=None,
+        lines=None,
+        source=None,
+        table=None,
+        columns=None,
+        snapshots=False,
+        replace_keys=None,
+    ):
         self.name = name
         self.path = path
         self.format = format
+        self.chunk_rows = chunk_rows
+        self.manifest = Manifest(manifest) if manifest else None
+        self.partition_cols = partition_cols
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.max_rows_by_file = max_rows_by_file
+        self.primary_keys = primary_keys
+        #: Loads replace all rows sharing these with a loaded or removed row
+        self.replace_keys = replace_keys or primary_keys
+        self.schema = schema
+        self.engine = engine
+        self.read_schema = arrow_schema(read_schema) if read_schema else None
+        self.lines = lines
+        #: Dataset this one is transformed from, and warehouse table it loads to
+        self.source = source
+        self.table = table
+        #: Columns read when a read doesn't ask for others
+        self.columns = columns
+        #: Readers and loads see published versions instead of the prefix
+        self.snapshot = Snapshot(path) if snapshots else None
+
+    def read(
+        self,
+        chunked: bool | int = False,
+        columns: list[str] | None = None,
+        partitions: dict | None = None,
+        filters: Filters | None = None,
+        paths: list[str] | None = None,
+    ) -> pd.DataFrame | Iterator[pd.DataFrame]:
+        """Read the dataset, optionally only some columns, partitions and rows.
+
+        columns default to the ones the dataset declares. partitions maps a
+        partition column to the list of values to keep, files in other
+        partitions are never fetched. filters keep the rows matching them, see
+        utils.filters. On Parquet, row groups whose statistics rule the filters
+        out are skipped without being fetched. paths reads only these objects
+        of the dataset instead of the published ones.
+        """
+
+        if chunked:
+            chunk_rows = None if chunked is True else chunked
+            return self.iter_chunks(
+                chunk_rows,
+                paths=paths,
+                columns=columns,
+                partitions=partitions,
+                filters=filters,
+            )
+
+        columns = columns or self.columns
+        published = paths if paths is not None else self.published()
+        path = published if published is not None else self.path
+        if published == []:
+            return pd.DataFrame(columns=columns or list(self.schema or []))
+
+        if self.format == "json" and (self.engine == "arrow" or get_cache()):
+            chunks = list(
+                self.iter_chunks(
+                    paths=published,
+                    columns=columns,
+                    partitions=partitions,
+                    filters=filters,
+                )
+            )
+            if not chunks:
+                return pd.DataFrame(columns=columns or list(self.schema or []))
+            return pd.concat(chunks, ignore_index=True)
+        elif self.format == "json":
+            df = wr.s3.read_json(path, **self._dataset_args(partitions))
+            df = filter_frame(df, filters)
+            return df[columns] if columns else df
+        elif self.format == "parquet":
+            scanner = self._parquet_scanner(published, columns, partitions, filters)
+            return scanner.to_table().to_pandas(types_mapper=pd.ArrowDtype)
+        elif self.format == "csv":
+            df = wr.s3.read_csv(
+                path,
+                usecols=self._with_filter_columns(columns, filters),
+                **self._dataset_args(partitions),
+            )
+            df = filter_frame(df, filters)
+            return df[columns] if columns else df
+        else:
+            raise ValueError(f"Unsupported format: {self.format}")
+
+    def iter_chunks(
+        self,
+        chunk_rows: int | None = None,
+        paths: list[str] | None = None,
+        columns: list[str] | None = None,
+        partitions: dict | None = None,
+        filters: Filters | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Yield the dataset, or only the given objects, as DataFrames of at
+        most chunk_rows rows"""
+
+        chunk_rows = chunk_rows or self.chunk_rows
+        columns = columns or self.columns
+        if paths is None:
+            paths = self.published()
+        if paths == []:
+            return
+        path = paths if paths is not None else self.path
+        dataset_args = self._dataset_args(partitions)
 
-    def read(self) -> pd.DataFrame:
         if self.format == "json":
-            return wr.s3.read_json(self.path)
+            copies = self._cached(paths, partitions)
+            if copies is not None:
+                paths = list(copies)
+            elif paths is None:
+                paths = wr.s3.list_objects(self.path, ignore_empty=True)
+            for path in paths:
+                local = copies[path] if copies is not None else None
+                if self.engine == "arrow":
+                    yield from self._iter_json_arrow(
+                        path, chunk_rows, columns, filters, local
+                    )
+                    continue
+
+                #: JSON arrays can't be parsed incrementally, so bound memory per file
+                df = pd.read_json(local) if local else wr.s3.read_json(path)
+                df = filter_frame(df, filters)
+                df = df[columns] if columns else df
+                for start in range(0, len(df.index), chunk_rows):
+                    yield df.iloc[start : start + chunk_rows]
         elif self.format == "parquet":
-            return wr.s3.read_parquet(self.path)
+            #: Reads row group by row group, never more than chunk_rows in memory
+            scanner = self._parquet_scanner(
+                paths, columns, partitions, filters, chunk_rows
+            )
+            for batch in scanner.to_batches():
+                if batch.num_rows:
+                    yield batch.to_pandas(types_mapper=pd.ArrowDtype)
         elif self.format == "csv":
-            return wr.s3.read_csv(self.path)
+            if paths is not None:
+                dataset_args = {}
+            for df in wr.s3.read_csv(
+                path,
+                chunksize=chunk_rows,
+                usecols=self._with_filter_columns(columns, filters),
+                **dataset_args,
+            ):
+                df = filter_frame(df, filters)
+                yield df[columns] if columns else df
         else:
             raise ValueError(f"Unsupported format: {self.format}")
 
-    def write(self, df: pd.DataFrame):
+    @staticmethod
+    def _with_filter_columns(
+        columns: list[str] | None, filters: Filters | None
+    ) -> list[str] | None:
+        """Columns to read so the filters can be applied after reading"""
+
+        if not columns:
+            return None
+        return list(dict.fromkeys(columns + filter_columns(filters)))
+
+    def _iter_json_arrow(
+        self,
+        path: str,
+        chunk_rows: int,
+        columns: list[str] | None,
+        filters: Filters | None = None,
+        local: str | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Decode one JSON object, or its local copy, straight into
+        Arrow-backed DataFrames"""
+
+        if local:
+            body = open(local, "rb")
+        else:
+            bucket, key = split_s3_path(path)
+            body = boto3.client("s3").get_object(Bucket=bucket, Key=key)["Body"]
+        lines = self.lines
+        if lines is None:
+            lines = path.endswith((".jsonl", ".ndjson"))
+
+        #: Fields nobody asked for are skipped by the parser, never decoded
+        schema = self.read_schema
+        needed = self._with_filter_columns(columns, filters)
+        if schema is not None and needed:
+            schema = pa.schema([schema.field(name) for name in needed])
+
+        expression = filter_expression(filters) if filters else None
+        with body:
+            for batch in read_json_batches(body, lines, schema, chunk_rows):
+                if expression is not None:
+                    batch = batch.filter(expression)
+                    if not batch.num_rows:
+                        continue
+                if columns:
+                    batch = batch.select(columns)
+                yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def _parquet_scanner(
+        self,
+        paths: list[str] | None,
+        columns: list[str] | None,
+        partitions: dict | None,
+        filters: Filters | None,
+        chunk_rows: int | None = None,
+    ) -> pa_ds.Scanner:
+        """Scan Parquet with Arrow, which prunes partitions and row groups
+        with the filters and fetches only the column chunks it reads.
+        awswrangler's reader can't filter rows and adds partition columns
+        nobody asked for, so every Parquet read goes past it and returns the
+        same columns and types. With a cache, local copies are scanned
+        memory-mapped instead."""
+
+        expression = filter_expression(filters) if filters else None
+        if partitions:
+            in_partitions = filter_expression(
+                [(column, "in", list(values)) for column, values in partitions.items()]
+            )
+            expression = (
+                in_partitions if expression is None else expression & in_partitions
+            )
+
+        copies = self._cached(paths, partitions)
+        if copies is not None:
+            source = list(copies.values())
+            filesystem = pa_fs.LocalFileSystem(use_mmap=True)
+            root = get_cache().local_root(self.path)
+        else:
+            root = self.path.removeprefix("s3://")
+            source = (
+                [path.removeprefix("s3://") for path in paths]
+                if paths is not None
+                else root
+            )
+            filesystem = s3_filesystem()
+
+        dataset = pa_ds.dataset(
+            source,
+            filesystem=filesystem,
+            format="parquet",
+            #: Partition values are typed from the path, launch_year=2020 is an int
+            partitioning="hive" if self.partition_cols else None,
+            partition_base_dir=root,
+        )
+        return dataset.scanner(
+            columns=columns,
+            filter=expression,
+            batch_size=chunk_rows or self.chunk_rows,
+        )
+
+    def published(self) -> list[str] | None:
+        """Files of the published version, None without snapshots or before
+        the first one, when the whole prefix is read"""
+
+        if self.snapshot is None:
+            return None
+        files = self.snapshot.files()
+        return list(files) if files is not None else None
+
+    def _cached(
+        self, paths: list[str] | None, partitions: dict | None
+    ) -> dict[str, str] | None:
+        """Local copies of the objects to read, by S3 path, or None when
+        there is no cache. Objects in other partitions aren't downloaded."""
+
+        object_cache = get_cache()
+        if object_cache is None:
+            return None
+
+        if paths is None:
+            #: The listing has every ETag, no request per object. Names starting
+            #: with _ or . aren't data, as when Arrow lists the prefix itself
+            etags = {
+                path: v["etag"]
+                for path, v in self.list_versions().items()
+                if not any(
+                    part.startswith(("_", "."))
+                    for part in path.removeprefix(self.path).split("/")
+                )
+            }
+        else:
+            etags = dict.fromkeys(paths)
+
+        in_partitions = self._dataset_args(partitions).get("partition_filter")
+        if in_partitions:
+            etags = {
+                path: etag
+                for path, etag in etags.items()
+                if in_partitions(self._partition_values(path))
+            }
+        return object_cache.get_many(etags)
+
+    def _partition_values(self, path: str) -> dict[str, str]:
+        """Hive partition values in the path of an object of the dataset"""
+
+        directories = path.removeprefix(self.path).split("/")[:-1]
+        return dict(d.split("=", 1) for d in directories if "=" in d)
+
+    def _dataset_args(self, partitions: dict | None) -> dict:
+        """Reader arguments that restore partition columns and prune partitions"""
+
+        if not self.partition_cols:
+            return {}
+
+        args = {"dataset": True}
+        if partitions:
+            #: Partition values come back from the path as strings
+            wanted = {
+                column: {str(value) for value in values}
+                for column, values in partitions.items()
+            }
+            args["partition_filter"] = lambda partition: all(
+                partition.get(column) in values for column, values in wanted.items()
+            )
+        return args
+
+    def list_versions(self) -> dict[str, dict]:
+        """ETag and last modified time of every object under the dataset path.
+
+        Both come back in the listing itself, so this costs one LIST request
+        per thousand objects and no per-object HEAD or GET.
+        """
+
+        bucket, prefix = split_s3_path(self.path)
+        paginator = boto3.client("s3").get_paginator("list_objects_v2")
+
+        versions = {}
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if obj["Size"] == 0:
+                    continue
+                versions[f"s3://{bucket}/{obj['Key']}"] = {
+                    "etag": obj["ETag"].strip('"'),
+                    "last_modified": obj["LastModified"].isoformat(),
+                }
+        return versions
+
+    def pending_objects(self) -> dict[str, dict]:
+        """Objects that are new or changed since they were last processed"""
+
+        if self.manifest is None:
+            raise ValueError(f"Dataset {self.name} has no manifest configured")
+
+        return {
+            path: version
+            for path, version in self.list_versions().items()
+            if not self.manifest.is_processed(path, version)
+        }
+
+    def write(
+        self, df: pd.DataFrame, mode="overwrite", publish: bool = True
+    ) -> list[str]:
+        """Write the DataFrame and return the paths of the written objects.
+
+        When the dataset declares a schema, only its columns are written, in
+        schema order and cast to the declared types.
+
+        With snapshots, nothing is deleted or replaced in place: the files are
+        written next to the published ones, named after this write, and
+        published as a new version, made of only these files on overwrite.
+        With publish=False the caller publishes them later, e.g. along with
+        the files of other writes.
+        """
+
+        if self.schema:
+            df = apply_schema(df, self.schema)
+
+        snapshot_args = {}
+        if self.snapshot:
+            snapshot_args = {"filename_prefix": f"{new_version()}_"}
+            overwrite, mode = mode == "overwrite", "append"
+
         if self.format == "csv":
-            wr.s3.to_csv(
-                df, path=self.path, index=False, mode="overwrite", dataset=True
+            result = wr.s3.to_csv(
+                df,
+                path=self.path,
+                index=False,
+                mode=mode,
+                dataset=True,
+                partition_cols=self.partition_cols,
+                **snapshot_args,
             )
         elif self.format == "parquet":
-            wr.s3.to_parquet(
-                df, path=self.path, index=False, mode="overwrite", dataset=True
+            write_table_args = {}
+            if self.row_group_size:
+                write_table_args["row_group_size"] = self.row_group_size
+
+            result = wr.s3.to_parquet(
+                df,
+                path=self.path,
+                index=False,
+                mode=mode,
+                dataset=True,
+                partition_cols=self.partition_cols,
+                compression=self.compression,
+                max_rows_by_file=self.max_rows_by_file,
+                pyarrow_additional_kwargs={"write_table_args": write_table_args},
+                **snapshot_args,
             )
         else:
             raise ValueError(f"Unsupported format: {self.format}")
+
+        paths = result["paths"]
+        if self.snapshot and publish:
+            if overwrite:
+                self.snapshot.publish(paths)
+            else:
+                self.snapshot.publish(lambda: (self.published() or []) + paths)
+        return paths
+
+    def delete(self, paths: list[str] | None = None):
+        """Delete the given objects, or the whole dataset. With snapshots,
+        they are left out of a new version instead, and deleted once no
+        version that is still read lists them."""
+
+        if self.snapshot and paths is None:
+            self.snapshot.publish([])
+        elif self.snapshot:
+            removed = set(paths)
+            self.snapshot.publish(
+                lambda: [path for path in self.published() or [] if path not in removed]
+            )
+        elif paths is None or paths:
+            wr.s3.delete_objects(paths if paths is not None else self.path)
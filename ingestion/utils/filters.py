@@ -0,0 +1,53 @@
+import operator
+
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+#: Row filters in disjunctive normal form, as pyarrow takes them: a list of
+#: (column, op, value) tuples that all have to match, or a list of such lists
+#: of which any one has to match
+Filters = list[tuple] | list[list[tuple]]
+
+OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda values, value: values.isin(value),
+    "not in": lambda values, value: ~values.isin(value),
+}
+
+
+def _groups(filters: Filters) -> list[list[tuple]]:
+    return filters if isinstance(filters[0], list) else [filters]
+
+
+def filter_columns(filters: Filters | None) -> list[str]:
+    """Columns the filters read"""
+
+    if not filters:
+        return []
+    return list(dict.fromkeys(f[0] for group in _groups(filters) for f in group))
+
+
+def filter_expression(filters: Filters) -> pc.Expression:
+    return pq.filters_to_expression(filters)
+
+
+def filter_frame(df: pd.DataFrame, filters: Filters | None) -> pd.DataFrame:
+    """Rows of df matching the filters, for readers that can't apply them"""
+
+    if not filters:
+        return df
+
+    mask = pd.Series(False, index=df.index)
+    for group in _groups(filters):
+        matches = pd.Series(True, index=df.index)
+        for column, op, value in group:
+            matches &= OPERATORS[op](df[column], value).fillna(False).astype(bool)
+        mask |= matches
+    return df[mask]
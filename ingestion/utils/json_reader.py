@@ -0,0 +1,158 @@
+import io
+from functools import partial
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+#: Bytes handed to each Arrow parsing thread at a time
+BLOCK_SIZE = 16 * 2**20
+#: Bytes of a JSON array rewritten as newline-delimited JSON at a time
+SPLIT_SIZE = 2**20
+
+_QUOTE, _BACKSLASH, _COMMA, _SPACE, _NEWLINE = b'"\\, \n'
+#: Bytes that may need rewriting outside strings, and their depth change
+_STRUCTURAL = np.zeros(256, bool)
+_STRUCTURAL[list(b"[]{},\r\n")] = True
+_DEPTH = np.zeros(256, np.int8)
+_DEPTH[list(b"[{")], _DEPTH[list(b"]}")] = 1, -1
+
+
+def _parse_options(schema: pa.Schema | None) -> pa_json.ParseOptions:
+    if schema is None:
+        return pa_json.ParseOptions()
+
+    #: Fields missing from the schema are skipped while parsing, never decoded
+    return pa_json.ParseOptions(
+        explicit_schema=schema, unexpected_field_behavior="ignore"
+    )
+
+
+class ArraySplitter:
+    """Rewrite a JSON array of objects as newline-delimited JSON, chunk by
+    chunk, without decoding it.
+
+    Quotes and structural bytes are located with numpy. A structural byte
+    is outside strings when an even number of unescaped quotes precede it,
+    and its nesting depth follows from the brackets outside strings before
+    it. The commas between the array's items become newlines, and its
+    brackets and the line breaks within items spaces, so each item is one
+    line of the same length. The state at the end of a chunk carries over to
+    the next one.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        #: Backslashes ending the previous chunk, they may escape a quote
+        self.backslashes = 0
+
+    def _escaped(self, data: np.ndarray, position: int) -> bool:
+        """Whether the quote at position follows an odd run of backslashes"""
+
+        start = position
+        while start and data[start - 1] == _BACKSLASH:
+            start -= 1
+        run = position - start + (self.backslashes if start == 0 else 0)
+        return run % 2 == 1
+
+    def split(self, chunk: bytes) -> bytes:
+        data = np.frombuffer(chunk, np.uint8)
+        if not data.size:
+            return chunk
+
+        quotes = np.flatnonzero(data == _QUOTE)
+        #: Backslashes are rare, only quotes right after one are looked at
+        after = data[np.maximum(quotes - 1, 0)] == _BACKSLASH
+        after[quotes == 0] = self.backslashes > 0
+        if after.any():
+            escaped = [self._escaped(data, position) for position in quotes[after]]
+            quotes = np.concatenate([quotes[~after], quotes[after][~np.array(escaped)]])
+            quotes.sort()
+
+        #: Outside strings, a byte has an even count of quotes before it
+        positions = np.flatnonzero(_STRUCTURAL[data])
+        outside = (np.searchsorted(quotes, positions) + self.in_string) % 2 == 0
+        positions = positions[outside]
+        values = data[positions]
+        depth = self.depth + np.cumsum(_DEPTH[values], dtype=np.int64)
+
+        lines = data.copy()
+        lines[positions[(values == ord("\r")) | (values == _NEWLINE)]] = _SPACE
+        lines[positions[(values == _COMMA) & (depth == 1)]] = _NEWLINE
+        #: The array's own brackets, at depth 1 after opening, 0 after closing
+        brackets = (values == ord("[")) & (depth == 1)
+        brackets |= (values == ord("]")) & (depth == 0)
+        lines[positions[brackets]] = _SPACE
+
+        if depth.size:
+            self.depth = int(depth[-1])
+        self.in_string = (quotes.size + self.in_string) % 2 == 1
+        end = data.size
+        while end and data[end - 1] == _BACKSLASH:
+            end -= 1
+        self.backslashes = data.size - end + (self.backslashes if end == 0 else 0)
+        return lines.tobytes()
+
+
+class _ChunkStream(io.RawIOBase):
+    """Readable stream over an iterable of byte chunks. Reads fill the buffer
+    until the chunks run out, Arrow takes every read as a whole block."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        filled = 0
+        while filled < len(buffer):
+            if not self._chunk:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._chunk = memoryview(chunk)
+            size = min(len(buffer) - filled, len(self._chunk))
+            buffer[filled : filled + size] = self._chunk[:size]
+            self._chunk = self._chunk[size:]
+            filled += size
+        return filled
+
+
+def read_json_batches(
+    stream: BinaryIO,
+    lines: bool,
+    schema: pa.Schema | None = None,
+    batch_rows: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Decode a JSON document of objects into Arrow record batches.
+
+    The document is streamed block by block through Arrow's multi-threaded
+    parser, so memory is bounded by the block size. A JSON array is rewritten
+    as newline-delimited JSON on the way, see ArraySplitter. Empty input, an
+    empty array too, yields no batches.
+    """
+
+    chunks = iter(partial(stream.read, SPLIT_SIZE), b"")
+    if not lines:
+        chunks = map(ArraySplitter().split, chunks)
+
+    #: Arrow refuses a stream without a single object
+    for first in chunks:
+        if first.strip():
+            break
+    else:
+        return
+
+    reader = pa_json.open_json(
+        _ChunkStream(chain([first], chunks)),
+        read_options=pa_json.ReadOptions(block_size=BLOCK_SIZE),
+        parse_options=_parse_options(schema),
+    )
+    for batch in reader:
+        for offset in range(0, batch.num_rows, batch_rows):
+            yield batch.slice(offset, batch_rows)
@@ -0,0 +1,203 @@
+import math
+from dataclasses import dataclass
+
+import awswrangler as wr
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pa_ds
+import pyarrow.parquet as pq
+from utils.dataset import Dataset, s3_filesystem
+from utils.schema import plain_types
+from utils.snapshot import new_version, put_copy_manifest
+
+#: COPY loads best from files of 1 MiB to 1 GiB after compression, of about
+#: the same size, so that every slice gets the same share of the work
+MIN_FILE_BYTES = 2**20
+TARGET_FILE_BYTES = 128 * 2**20
+MAX_FILE_BYTES = 2**30
+
+
+def file_columns(dataset: Dataset) -> list[str] | None:
+    """Columns stored in the files, in catalog order. Partition columns are
+    only in the paths, so COPY doesn't get them."""
+
+    if not dataset.schema:
+        return None
+    partitions = set(dataset.partition_cols or [])
+    return [column for column in dataset.schema if column not in partitions]
+
+
+def plan_file_count(total_bytes: int, slices: int) -> int:
+    """Number of files to load total_bytes from: a multiple of slices once
+    there is enough data for every slice to get a file of MIN_FILE_BYTES"""
+
+    count = max(1, math.ceil(total_bytes / TARGET_FILE_BYTES))
+    if total_bytes < slices * MIN_FILE_BYTES:
+        return max(1, min(count, total_bytes // MIN_FILE_BYTES))
+    return math.ceil(count / slices) * slices
+
+
+@dataclass
+class Delta:
+    """Stage files a load applies to its table"""
+
+    #: Published version loaded, None without snapshots
+    version: str | None
+    #: Files whose rows are inserted, and their sizes
+    added: dict[str, int]
+    #: Files no longer published, whose rows are deleted by replace key
+    removed: list[str]
+    #: Whether the table is replaced as a whole instead of merged
+    full: bool
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.full)
+
+
+def _listed(dataset: Dataset) -> dict[str, int]:
+    """Data files under the dataset prefix and their sizes"""
+
+    return {
+        path: size
+        for path, size in wr.s3.size_objects(dataset.path).items()
+        if "/_" not in path.removeprefix(dataset.path)
+    }
+
+
+def plan_delta(dataset: Dataset, consumer: str, current: bool) -> Delta:
+    """What a load of the dataset into the consumer table has to apply.
+
+    A current table, one that exists with the catalog columns and types, of a
+    dataset with keys and snapshots, is merged with the files published and
+    unpublished since the version it last loaded, so a load costs what
+    changed rather than the whole history. Otherwise, or when that version
+    is no longer known, every file replaces the table.
+    """
+
+    snapshot = dataset.snapshot
+    version = snapshot.current()[0] if snapshot else None
+    files = snapshot.files(version) if version else None
+    if files is None:
+        version, files = None, _listed(dataset)
+
+    previous = None
+    if version and current and dataset.primary_keys:
+        loaded = snapshot.loaded(consumer)
+        previous = snapshot.files(loaded) if loaded else None
+    if previous is None:
+        return Delta(version, files, [], full=True)
+
+    return Delta(
+        version,
+        added={path: size for path, size in files.items() if path not in previous},
+        removed=[path for path in previous if path not in files],
+        full=False,
+    )
+
+
+def removed_keys(dataset: Dataset, paths: list[str]) -> pd.DataFrame:
+    """Distinct replace keys of the rows in the files, reading only the key
+    columns"""
+
+    keys = dataset.read(columns=dataset.replace_keys, paths=paths)
+    return plain_types(keys[dataset.replace_keys].drop_duplicates())
+
+
+class LoadFiles:
+    """Files of a dataset laid out for COPY, listed in a manifest.
+
+    The files a dataset is written in follow its partitions and writes, so
+    they are often many small ones, which COPY spends more time opening than
+    reading, or a few large ones, which leave slices idle. Unless they are
+    already balanced, Parquet files are rewritten into plan_file_count() files
+    of equal row counts under <path>_load/, with the catalog columns in
+    catalog order.
+    """
+
+    def __init__(self, dataset: Dataset, slices: int):
+        self.dataset = dataset
+        self.slices = slices
+        self.columns = file_columns(dataset)
+        self.prefix = f"{dataset.path}_load/{new_version()}/"
+        self.written: list[str] = []
+
+    def _balanced(self, sizes: dict[str, int], count: int) -> bool:
+        if len(sizes) != count:
+            return False
+        average = sum(sizes.values()) / count
+        return all(
+            average / 2 <= size <= min(2 * average, MAX_FILE_BYTES)
+            for size in sizes.values()
+        )
+
+    def _split(self, sources: list[str], count: int) -> dict[str, int]:
+        filesystem = s3_filesystem()
+        scanner = pa_ds.dataset(
+            [path.removeprefix("s3://") for path in sources],
+            filesystem=filesystem,
+            format="parquet",
+        ).scanner(columns=self.columns, batch_size=self.dataset.chunk_rows)
+        #: The first extra files get a row more, so there are exactly count
+        base, extra = divmod(scanner.count_rows(), count)
+
+        parts: list[str] = []
+        writer, rows = None, 0
+        for batch in scanner.to_batches():
+            while batch.num_rows:
+                if writer is None:
+                    rows_per_file = base + (len(parts) < extra)
+                    path = f"{self.prefix}part-{len(parts):05d}.parquet"
+                    parts.append(path)
+                    self.written.append(path)
+                    writer = pq.ParquetWriter(
+                        path.removeprefix("s3://"),
+                        batch.schema,
+                        filesystem=filesystem,
+                        compression=self.dataset.compression or "zstd",
+                    )
+                taken = min(batch.num_rows, rows_per_file - rows)
+                writer.write_batch(
+                    batch.slice(0, taken), row_group_size=self.dataset.row_group_size
+                )
+                batch, rows = batch.slice(taken), rows + taken
+                if rows == rows_per_file:
+                    writer.close()
+                    writer, rows = None, 0
+        if writer is not None:
+            writer.close()
+
+        infos = filesystem.get_file_info([path.removeprefix("s3://") for path in parts])
+        return {path: info.size for path, info in zip(parts, infos)}
+
+    def manifest(self, files: dict[str, int]) -> str:
+        """Path of a COPY manifest of the files, path -> size, rewritten first
+        unless they are balanced"""
+
+        count = plan_file_count(sum(files.values()), self.slices)
+        if self.dataset.format == "parquet" and not self._balanced(files, count):
+            files = self._split(list(files), count)
+
+        manifest = f"{self.prefix.removesuffix('/')}.json"
+        self.written.append(manifest)
+        put_copy_manifest(manifest, files)
+        return manifest
+
+    def keys(self, keys: pd.DataFrame) -> str:
+        """Path of a Parquet file of the keys, to COPY next to the table"""
+
+        path = f"{self.prefix}keys.parquet"
+        self.written.append(path)
+        pq.write_table(
+            pa.Table.from_pandas(keys, preserve_index=False),
+            path.removeprefix("s3://"),
+            filesystem=s3_filesystem(),
+        )
+        return path
+
+    def cleanup(self):
+        """Delete the files written for the load"""
+
+        if self.written:
+            wr.s3.delete_objects(self.written)
+            self.written = []
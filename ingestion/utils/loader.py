@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from utils.pool import ConnectionPool
+
+
+@dataclass
+class LoadResult:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class LoadScheduler:
+    """Run independent table loads concurrently.
+
+    Every load takes a connection from the pool for its duration, so no
+    connection is used by two loads at once, and is retried on a new one if
+    its connection breaks.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_workers: int = 4):
+        self.pool = pool
+        self.max_workers = max_workers
+
+    def _run_one(self, table: str, load: Callable[[Any], int]) -> LoadResult:
+        start = time.perf_counter()
+        rows = self.pool.run(load)
+        return LoadResult(table, rows, time.perf_counter() - start)
+
+    def run(self, loads: dict[str, Callable[[Any], int]]) -> list[LoadResult]:
+        """Run every load, a callable taking a connection and returning the
+        number of rows loaded, and report them in completion order"""
+
+        results, errors = [], []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {
+                pool.submit(self._run_one, table, load): table
+                for table, load in loads.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Error loading {futures[future]}: {str(e)}")
+                    errors.append(e)
+                    continue
+                print(
+                    f"✅ Loaded {result.rows} rows into {result.table} "
+                    f"in {result.seconds:.1f}s ({result.rows_per_second:,.0f} rows/s)"
+                )
+                results.append(result)
+
+        if errors:
+            raise errors[0]
+        return results
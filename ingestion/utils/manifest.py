@@ -0,0 +1,120 @@
+import json
+import random
+import time
+
+import boto3
+
+
+def split_s3_path(path: str) -> tuple[str, str]:
+    """Split an s3://bucket/key path into bucket and key"""
+
+    bucket, _, key = path.removeprefix("s3://").partition("/")
+    return bucket, key
+
+
+def put_if_unchanged(path: str, body: bytes, etag: str | None) -> str | None:
+    """Write an S3 object only if it is still at the version with this ETag,
+    or still absent without one. Return the new ETag, or None if another
+    writer changed it first."""
+
+    bucket, key = split_s3_path(path)
+    s3 = boto3.client("s3")
+    condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+    try:
+        response = s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/json",
+            **condition,
+        )
+    except s3.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] not in (
+            "PreconditionFailed",
+            "ConditionalRequestConflict",
+        ):
+            raise
+        return None
+    return response["ETag"]
+
+
+def backoff(attempt: int):
+    """Sleep with jitter before retrying a conflicting write, e.g. hundreds of
+    array job children finishing at once all update the same object"""
+
+    time.sleep(random.uniform(0, min(2**attempt * 0.1, 10)))
+
+
+class Manifest:
+    """Raw objects already processed, persisted as a JSON document on S3.
+
+    Each entry is keyed by the object path and records the ETag and last
+    modified time it had when processed, plus the stage files written from it
+    so a changed object can replace its previous output.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries = None
+        self._etag = None
+        self._recorded = {}
+
+    @property
+    def entries(self) -> dict:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> dict:
+        bucket, key = split_s3_path(self.path)
+        s3 = boto3.client("s3")
+        try:
+            response = s3.get_object(Bucket=bucket, Key=key)
+        except s3.exceptions.NoSuchKey:
+            self._etag = None
+            return {}
+        self._etag = response["ETag"]
+        return json.loads(response["Body"].read())
+
+    def save(self, attempts: int = 20):
+        """Write the manifest, merging in entries recorded concurrently by
+        other runs, e.g. other shards of the same transformation"""
+
+        for attempt in range(attempts):
+            etag = put_if_unchanged(
+                self.path, json.dumps(self.entries, indent=2).encode(), self._etag
+            )
+            if etag is None:
+                backoff(attempt)
+                self._entries = {**self._load(), **self._recorded}
+                continue
+            self._etag = etag
+            return
+        raise RuntimeError(f"Manifest {self.path} kept changing while saving")
+
+    def is_processed(self, path: str, version: dict) -> bool:
+        entry = self.entries.get(path)
+        return entry is not None and entry["etag"] == version["etag"]
+
+    def outputs(self, path: str) -> dict[str, list[str]]:
+        """Stage files written from a raw object on its last run, by dataset"""
+
+        return self.entries.get(path, {}).get("outputs", {})
+
+    def dataset_outputs(self, name: str) -> list[str]:
+        """Stage files of a dataset written from every raw object"""
+
+        return [
+            output
+            for entry in self.entries.values()
+            for output in entry.get("outputs", {}).get(name, [])
+        ]
+
+    def reload(self) -> "Manifest":
+        """Read the manifest again, keeping the entries recorded by this run"""
+
+        self._entries = {**self._load(), **self._recorded}
+        return self
+
+    def record(self, path: str, version: dict, outputs: dict[str, list[str]]):
+        self.entries[path] = self._recorded[path] = {**version, "outputs": outputs}
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def _flatten_struct(array: pa.StructArray, prefix: str = ""):
+    """Yield a (name, array) pair per leaf field, dotted like json_normalize"""
+
+    for field, child in zip(array.type, array.flatten()):
+        name = f"{prefix}{field.name}"
+        if pa.types.is_struct(child.type):
+            yield from _flatten_struct(child, f"{name}.")
+        else:
+            yield name, child
+
+
+def explode_structs(
+    data: pd.DataFrame | pa.Table,
+    column: str,
+    keep: dict[str, str] | None = None,
+    position: str | None = None,
+) -> pd.DataFrame:
+    """Flatten a list-of-struct column into one row per list element.
+
+    The work happens on Arrow buffers: list offsets give the parent row of
+    every element and struct fields are extracted as whole columns, instead
+    of exploding and normalizing one Python dict at a time. Columns named in
+    keep are repeated for each element under their new name, and position
+    names an optional column holding each element's index in its list. Rows
+    whose list is empty or null produce no output rows.
+    """
+
+    keep = keep or {}
+
+    if isinstance(data, pd.DataFrame):
+        data = pa.Table.from_pandas(data[[*keep, column]], preserve_index=False)
+
+    lists = data.column(column).combine_chunks()
+    parents = pc.list_parent_indices(lists)
+    items = pc.list_flatten(lists)
+
+    columns = {new: data.column(old).take(parents) for old, new in keep.items()}
+    if position:
+        offsets = lists.offsets.to_numpy()
+        columns[position] = (
+            np.arange(len(items)) + offsets[0] - offsets[parents.to_numpy()]
+        )
+    if pa.types.is_struct(items.type):
+        columns.update(_flatten_struct(items))
+
+    return pa.table(columns).to_pandas()
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable
+
+DEFAULT_MAX_SIZE = 4
+#: Connections idle for longer are checked before being handed out
+DEFAULT_CHECK_AFTER_SECONDS = 60
+
+
+def ping(connection):
+    """Run a trivial query, raising if the connection is unusable"""
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+class ConnectionPool:
+    """Bounded pool of warehouse connections shared by threads.
+
+    At most max_size connections are open, a thread needing one more waits
+    for another to be returned, up to timeout seconds. Connections are only
+    opened when needed and reused afterwards, so loads of many tables or
+    tenants don't pay the connection setup each.
+
+    A connection idle for more than check_after seconds is checked with a
+    trivial query before it is handed out, and one an operation failed on is
+    checked before it is returned. Broken ones are closed and replaced with
+    a new connection on next use.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = DEFAULT_MAX_SIZE,
+        check_after: float = DEFAULT_CHECK_AFTER_SECONDS,
+        timeout: float | None = None,
+        health_check: Callable[[Any], None] = ping,
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.check_after = check_after
+        self.timeout = timeout
+        self.health_check = health_check
+        #: Idle connections and when they were returned, most recent last
+        self._idle: deque[tuple[Any, float]] = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+
+    def _healthy(self, connection) -> bool:
+        try:
+            self.health_check(connection)
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No connection returned within {self.timeout}s")
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    #: The most recently used one is the least likely to be stale
+                    connection, returned = self._idle.pop()
+                if time.monotonic() - returned <= self.check_after:
+                    return connection
+                if self._healthy(connection):
+                    return connection
+                self._discard(connection)
+            return self.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, connection, healthy: bool = True):
+        if healthy:
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+        else:
+            self._discard(connection)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Connection for the duration of the block, returned afterwards"""
+
+        connection = self._checkout()
+        try:
+            yield connection
+        except BaseException:
+            self._checkin(connection, self._healthy(connection))
+            raise
+        self._checkin(connection)
+
+    def run(self, operation: Callable[[Any], Any], attempts: int = 2) -> Any:
+        """Call operation with a connection and return its result.
+
+        If it fails because the connection broke, it is called again on a new
+        connection, up to attempts times in all, so operations have to be
+        safe to repeat: a single transaction, or idempotent.
+        """
+
+        for attempt in range(attempts):
+            connection = self._checkout()
+            try:
+                result = operation(connection)
+            except Exception:
+                healthy = self._healthy(connection)
+                self._checkin(connection, healthy)
+                if healthy or attempt == attempts - 1:
+                    raise
+                continue
+            self._checkin(connection)
+            return result
+
+    def close(self):
+        """Close the idle connections. The pool stays usable and opens new
+        ones when needed."""
+
+        with self._lock:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        for connection in idle:
+            self._discard(connection)
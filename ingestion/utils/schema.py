@@ -0,0 +1,84 @@
+import pandas as pd
+import pyarrow as pa
+
+#: Catalog schema type -> pandas dtype, Arrow-backed or nullable where possible
+DTYPES = {
+    "string": "string[pyarrow]",
+    "category": "category",
+    "boolean": "boolean",
+    "int": "Int64",
+    "float": "Float64",
+}
+
+#: Catalog schema type -> SQL type of the warehouse column
+SQL_TYPES = {
+    "string": "VARCHAR",
+    "category": "VARCHAR",
+    "boolean": "BOOLEAN",
+    "int": "BIGINT",
+    "float": "FLOAT8",
+    "timestamp": "TIMESTAMPTZ",
+    "timestamp_local": "TIMESTAMP",
+}
+
+
+def _convert(values: pd.Series, type_: str) -> pd.Series:
+    if type_ == "timestamp":
+        return pd.to_datetime(values, utc=True)
+    elif type_ == "timestamp_local":
+        #: Wall clock time as written, the UTC offset is dropped
+        return pd.to_datetime(values.astype("string").str.slice(0, 19))
+    elif type_ in DTYPES:
+        return values.astype(DTYPES[type_])
+    else:
+        raise ValueError(f"Unsupported schema type: {type_}")
+
+
+def apply_schema(df: pd.DataFrame, schema: dict[str, str]) -> pd.DataFrame:
+    """Return the schema columns of df, in schema order, cast to their types"""
+
+    missing = [column for column in schema if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns for schema: {', '.join(missing)}")
+
+    typed = {}
+    for column, type_ in schema.items():
+        try:
+            typed[column] = _convert(df[column], type_)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Column {column} can't be cast to {type_}: {e}") from e
+
+    return pd.DataFrame(typed, index=df.index)
+
+
+def arrow_type(spec) -> pa.DataType:
+    """Arrow type from YAML: a type alias such as int64, a mapping for a
+    struct, or a one item list for a list of that item"""
+
+    if isinstance(spec, dict):
+        return pa.struct([(name, arrow_type(field)) for name, field in spec.items()])
+    elif isinstance(spec, list):
+        return pa.list_(arrow_type(spec[0]))
+    else:
+        return pa.type_for_alias(spec)
+
+
+def arrow_schema(spec: dict) -> pa.Schema:
+    return pa.schema([(name, arrow_type(field)) for name, field in spec.items()])
+
+
+def plain_types(df: pd.DataFrame) -> pd.DataFrame:
+    """df with categorical and dictionary columns decoded to their values,
+    which databases would otherwise turn into enums of the values seen"""
+
+    decoded = {}
+    for column, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            decoded[column] = df[column].astype(dtype.categories.dtype)
+        elif isinstance(dtype, pd.ArrowDtype) and pa.types.is_dictionary(
+            dtype.pyarrow_dtype
+        ):
+            decoded[column] = df[column].astype(
+                pd.ArrowDtype(dtype.pyarrow_dtype.value_type)
+            )
+    return df.assign(**decoded) if decoded else df
@@ -0,0 +1,203 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import awswrangler as wr
+import boto3
+from utils.manifest import backoff, put_if_unchanged, split_s3_path
+
+#: Unreferenced files and snapshots are kept this long, longer than any load
+#: or transformation job runs, so none of them loses files it is reading
+DEFAULT_RETENTION = timedelta(hours=24)
+
+
+def new_version() -> str:
+    """Snapshot version, sorting in publication order"""
+
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+
+def put_copy_manifest(path: str, sizes: dict[str, int]):
+    """Write a Redshift COPY manifest of files, path -> size. The size is
+    required to COPY columnar files."""
+
+    manifest = {
+        "entries": [
+            {"url": url, "mandatory": True, "meta": {"content_length": size}}
+            for url, size in sizes.items()
+        ]
+    }
+    bucket, key = split_s3_path(path)
+    boto3.client("s3").put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(manifest).encode(),
+        ContentType="application/json",
+    )
+
+
+class Snapshot:
+    """Published versions of a dataset, each an immutable list of its files.
+
+    A version is stored as <path>_snapshots/<version>.json in the manifest
+    format Redshift COPY takes, and <path>_manifest points at the current
+    one. Readers and loads resolve the pointer and read exactly the files of
+    that version: they never list the prefix, nor see files being written or
+    a prefix being replaced. Writers publish by moving the pointer with a
+    conditional write, so concurrent writers never lose each other's update.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pointer_path = f"{path}_manifest"
+
+    def manifest_path(self, version: str) -> str:
+        return f"{self.path}_snapshots/{version}.json"
+
+    def _get(self, path: str) -> tuple[dict | None, str | None]:
+        bucket, key = split_s3_path(path)
+        s3 = boto3.client("s3")
+        try:
+            response = s3.get_object(Bucket=bucket, Key=key)
+        except s3.exceptions.NoSuchKey:
+            return None, None
+        return json.loads(response["Body"].read()), response["ETag"]
+
+    def current(self) -> tuple[str | None, str | None]:
+        """Current version and the ETag of the pointer, None if unpublished"""
+
+        pointer, etag = self._get(self.pointer_path)
+        return (pointer["version"] if pointer else None), etag
+
+    def files(self, version: str | None = None) -> dict[str, int] | None:
+        """Files of a version, the current one by default, and their sizes.
+        None if nothing was published yet, or the version was collected."""
+
+        version = version or self.current()[0]
+        if version is None:
+            return None
+        manifest, _ = self._get(self.manifest_path(version))
+        if manifest is None:
+            return None
+        return {
+            entry["url"]: entry["meta"]["content_length"]
+            for entry in manifest["entries"]
+        }
+
+    def publish(
+        self, files: list[str] | Callable[[], list[str]], attempts: int = 20
+    ) -> str:
+        """Publish a version made of files and return it. files may be a
+        callable, called again on every attempt after the pointer is read, so
+        a retry after a concurrent publish starts from fresh state."""
+
+        for attempt in range(attempts):
+            version, etag = self.current()
+            paths = files() if callable(files) else files
+
+            #: COPY needs the size of columnar files, only new ones are fetched
+            sizes = self.files(version) if version else {}
+            if version and set(paths) == set(sizes):
+                return version
+            missing = [path for path in paths if path not in sizes]
+            if missing:
+                sizes.update(wr.s3.size_objects(missing))
+
+            new = new_version()
+            put_copy_manifest(
+                self.manifest_path(new), {path: sizes[path] for path in paths}
+            )
+
+            if put_if_unchanged(
+                self.pointer_path, json.dumps({"version": new}).encode(), etag
+            ):
+                return new
+
+            #: Never published, so no reader can have it
+            wr.s3.delete_objects([self.manifest_path(new)])
+            backoff(attempt)
+        raise RuntimeError(f"Snapshot {self.pointer_path} kept changing")
+
+    def loaded_path(self, consumer: str) -> str:
+        return f"{self.path}_loaded/{consumer}.json"
+
+    def loaded(self, consumer: str) -> str | None:
+        """Version a consumer, e.g. a warehouse table, last loaded"""
+
+        state, _ = self._get(self.loaded_path(consumer))
+        return state["version"] if state else None
+
+    def mark_loaded(self, consumer: str, version: str):
+        """Record the version a consumer loaded, which its next load starts
+        from. Kept by collect_garbage along with its files."""
+
+        bucket, key = split_s3_path(self.loaded_path(consumer))
+        boto3.client("s3").put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps({"version": version}).encode(),
+            ContentType="application/json",
+        )
+
+    def _last_modified(self) -> dict[str, datetime]:
+        """Last modified time of every object under the dataset path, from
+        the listing alone"""
+
+        bucket, prefix = split_s3_path(self.path)
+        paginator = boto3.client("s3").get_paginator("list_objects_v2")
+        return {
+            f"s3://{bucket}/{obj['Key']}": obj["LastModified"]
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for obj in page.get("Contents", [])
+        }
+
+    def collect_garbage(self, retention: timedelta = DEFAULT_RETENTION) -> int:
+        """Delete files and versions unreferenced for longer than retention,
+        and return how many objects were deleted.
+
+        Files are kept while any version published within retention lists
+        them, for loads still reading it, and while they are younger than
+        retention, for writers that didn't publish them yet. Versions last
+        loaded by a consumer are kept too, its next load diffs against them.
+        """
+
+        current, _ = self.current()
+        if current is None:
+            return 0
+
+        cutoff = datetime.now(timezone.utc) - retention
+        snapshots_prefix = self.manifest_path("").removesuffix(".json")
+        loaded_prefix = self.loaded_path("").removesuffix(".json")
+        objects = self._last_modified()
+
+        snapshots = {
+            path.removeprefix(snapshots_prefix).removesuffix(".json"): modified
+            for path, modified in objects.items()
+            if path.startswith(snapshots_prefix)
+        }
+        loaded = {
+            self._get(path)[0]["version"]
+            for path in objects
+            if path.startswith(loaded_prefix)
+        }
+        recent = {
+            version
+            for version, modified in snapshots.items()
+            if version == current or version in loaded or modified > cutoff
+        }
+        referenced = set()
+        for version in recent:
+            referenced |= set(self.files(version))
+
+        expired = [self.manifest_path(v) for v in snapshots if v not in recent]
+        expired += [
+            path
+            for path, modified in objects.items()
+            if not path.startswith((snapshots_prefix, loaded_prefix, self.pointer_path))
+            and path not in referenced
+            and modified < cutoff
+        ]
+        if expired:
+            wr.s3.delete_objects(expired)
+        return len(expired)
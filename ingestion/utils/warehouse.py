@@ -0,0 +1,325 @@
+import os
+from functools import cache
+
+import awswrangler as wr
+import redshift_connector
+from utils.credentials import get_secrets
+from utils.dataset import Dataset
+from utils.load_files import LoadFiles, file_columns, plan_delta, removed_keys
+from utils.pool import ConnectionPool
+from utils.schema import SQL_TYPES, plain_types
+
+#: Slices COPY spreads the files of a load across, load files are split into
+#: multiples of it. Serverless doesn't expose its slices, so it defaults to the
+#: base RPUs of the workgroup.
+DEFAULT_SLICES = 128
+
+
+class Redshift:
+    """Redshift Serverless, loaded with COPY from a manifest of the stage files"""
+
+    #: information_schema data_type of the SQL types tables are created with
+    COLUMN_TYPES = {
+        "VARCHAR": "character varying",
+        "BOOLEAN": "boolean",
+        "BIGINT": "bigint",
+        "FLOAT8": "double precision",
+        "TIMESTAMPTZ": "timestamp with time zone",
+        "TIMESTAMP": "timestamp without time zone",
+    }
+
+    def __init__(self, secret_id: str, slices: int = DEFAULT_SLICES):
+        self.secret_id = secret_id
+        self.slices = slices
+
+    def _connect(self, secret: dict):
+        return redshift_connector.connect(
+            user=secret["username"],
+            password=secret["password"],
+            host=secret["host"],
+            port=int(secret["port"]),
+            database=secret["dbname"],
+            ssl=True,
+            tcp_keepalive=True,
+        )
+
+    def connect(self):
+        """Open a connection with the cached credentials, fetched again once
+        if they are rejected, in case the secret was rotated"""
+
+        secrets = get_secrets()
+        try:
+            return self._connect(secrets.get(self.secret_id))
+        except redshift_connector.Error:
+            secrets.invalidate(self.secret_id)
+            return self._connect(secrets.get(self.secret_id))
+
+    def load(self, con, dataset: Dataset, table: str, schema: str) -> int:
+        """Load data to Redshift and return the number of rows copied.
+
+        Only what changed since the version last loaded into the table is
+        applied, see plan_delta: target rows sharing a replace key with a
+        removed file are deleted, then the added files are copied into a
+        temporary staging table, target rows matching them by replace key
+        deleted and the staged rows inserted. A table without a version to
+        start from, whose columns or types differ from the catalog, or of a
+        dataset without keys, is dropped, created again with the catalog
+        types and copied into instead, so a table created by an older release
+        or before a catalog change is replaced rather than failing the COPY. Either way in one transaction, so readers never see
+        an empty or half merged table.
+
+        Files are copied from a manifest of files balanced across the slices,
+        see LoadFiles, and by column name in catalog order.
+        """
+
+        consumer = target = f"{schema}.{table}"
+        with con.cursor() as cursor:
+            cursor.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = %s AND table_name = %s",
+                (schema, table),
+            )
+            current = _matches_catalog(
+                dict(cursor.fetchall()), dataset, self.COLUMN_TYPES
+            )
+
+        delta = plan_delta(dataset, consumer, current)
+        if delta.empty:
+            return 0
+
+        merge = not delta.full
+        if merge:
+            mode_args = {"mode": "upsert", "primary_keys": dataset.replace_keys}
+        else:
+            #: Without a schema the COPY creates the table from the files
+            mode_args = {"mode": "append", "primary_keys": dataset.primary_keys}
+
+        #: Automatic compression analysis only pays off on a table that is
+        #: kept, new tables get ENCODE AUTO. Statistics of a staging table are
+        #: dropped with it, those of a table copied into are needed by queries.
+        copy_params = [
+            "COMPUPDATE OFF",
+            "STATUPDATE OFF" if merge else "STATUPDATE ON",
+        ]
+
+        files = LoadFiles(dataset, self.slices)
+        rows = 0
+        try:
+            if delta.full:
+                with con.cursor() as cursor:
+                    #: Fails on dependent views rather than dropping them too
+                    cursor.execute(f"DROP TABLE IF EXISTS {target}")
+                    if dataset.schema:
+                        self._create_table(cursor, target, dataset)
+
+            keys = removed_keys(dataset, delta.removed) if delta.removed else None
+            if keys is not None and len(keys.index):
+                self._delete_keys(con, files.keys(keys), dataset, schema, table)
+
+            if delta.added:
+                columns = file_columns(dataset)
+                wr.redshift.copy_from_files(
+                    path=files.manifest(delta.added),
+                    manifest=True,
+                    table=table,
+                    schema=schema,
+                    data_format=dataset.format,
+                    con=con,
+                    column_names=(
+                        [f'"{column}"' for column in columns] if columns else None
+                    ),
+                    sql_copy_extra_params=copy_params,
+                    commit_transaction=False,
+                    **mode_args,
+                )
+                #: Rows loaded by the last COPY run on this session
+                with con.cursor() as cursor:
+                    cursor.execute("SELECT pg_last_copy_count()")
+                    rows = cursor.fetchone()[0]
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            files.cleanup()
+
+        #: After the commit: applying a delta again changes nothing, so a load
+        #: stopped in between starts over from the previous version
+        if delta.version:
+            dataset.snapshot.mark_loaded(consumer, delta.version)
+        return rows
+
+    @staticmethod
+    def _create_table(cursor, target: str, dataset: Dataset):
+        """Create the target with the catalog types of the file columns and
+        the primary keys, not types inferred from the files"""
+
+        columns = [
+            f'"{column}" {SQL_TYPES[dataset.schema[column]]}'
+            for column in file_columns(dataset)
+        ]
+        if dataset.primary_keys:
+            keys = ", ".join(f'"{key}"' for key in dataset.primary_keys)
+            columns.append(f"PRIMARY KEY ({keys})")
+        cursor.execute(f"CREATE TABLE {target} ({', '.join(columns)})")
+
+    @staticmethod
+    def _delete_keys(con, path: str, dataset: Dataset, schema: str, table: str):
+        """Delete the target rows sharing a replace key with the keys file,
+        copied into a scratch table dropped in the same transaction"""
+
+        scratch = f"{table}_removed_keys"
+        wr.redshift.copy_from_files(
+            path=path,
+            table=scratch,
+            schema=schema,
+            con=con,
+            mode="overwrite",
+            overwrite_method="drop",
+            commit_transaction=False,
+        )
+        join = _key_join(f"{schema}.{table}", "removed", dataset.replace_keys)
+        with con.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {schema}.{table} "
+                f"USING {schema}.{scratch} AS removed WHERE {join}"
+            )
+            cursor.execute(f"DROP TABLE {schema}.{scratch}")
+
+
+class DuckDB:
+    """Local stand-in for Redshift backed by a DuckDB database file.
+
+    The stage data is read through Dataset, so it follows the same storage
+    endpoint as the rest of the pipeline, and merged with the same
+    DELETE/INSERT semantics as the Redshift upsert.
+    """
+
+    #: information_schema data_type of the SQL types tables are created with
+    COLUMN_TYPES = {
+        "VARCHAR": "VARCHAR",
+        "BOOLEAN": "BOOLEAN",
+        "BIGINT": "BIGINT",
+        "FLOAT8": "DOUBLE",
+        "TIMESTAMPTZ": "TIMESTAMP WITH TIME ZONE",
+        "TIMESTAMP": "TIMESTAMP",
+    }
+
+    def __init__(self, database: str):
+        self.database = database
+
+    def connect(self):
+        #: Optional dependency, only needed to run the pipeline locally
+        import duckdb
+
+        return duckdb.connect(self.database)
+
+    def load(self, con, dataset: Dataset, table: str, schema: str) -> int:
+        consumer = target = f"{schema}.{table}"
+        existing = con.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = ? AND table_name = ?",
+            [schema, table],
+        ).fetchall()
+        current = _matches_catalog(dict(existing), dataset, self.COLUMN_TYPES)
+
+        delta = plan_delta(dataset, consumer, current)
+        if delta.empty:
+            return 0
+
+        #: Partition columns aren't in the files, so Redshift doesn't get them.
+        #: Exactly the file columns are kept, whatever else the reader returns
+        columns = file_columns(dataset)
+        staged = dataset.read(columns=columns, paths=list(delta.added))
+        if columns is None:
+            partitions = set(dataset.partition_cols or [])
+            columns = [column for column in staged.columns if column not in partitions]
+        staged = plain_types(staged[columns])
+        names = ", ".join(columns)
+
+        keys = removed_keys(dataset, delta.removed) if delta.removed else None
+        con.register("staged", staged)
+        if keys is not None:
+            con.register("removed", keys)
+        try:
+            con.begin()
+            if delta.full:
+                self._create_table(con, target, dataset, columns)
+            if keys is not None:
+                join = _key_join(target, "removed", dataset.replace_keys)
+                con.execute(f"DELETE FROM {target} USING removed WHERE {join}")
+            if not delta.full:
+                join = _key_join(target, "staged", dataset.replace_keys)
+                con.execute(f"DELETE FROM {target} USING staged WHERE {join}")
+            con.execute(f"INSERT INTO {target} ({names}) SELECT {names} FROM staged")
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            con.unregister("staged")
+            if keys is not None:
+                con.unregister("removed")
+
+        if delta.version:
+            dataset.snapshot.mark_loaded(consumer, delta.version)
+        return len(staged.index)
+
+    @staticmethod
+    def _create_table(con, target: str, dataset: Dataset, columns: list[str]):
+        """Create or replace the target with the catalog types of the columns,
+        not ones inferred from a first load that later loads may not fit, nor
+        the ones of a table created by an older release"""
+
+        if dataset.schema:
+            types = ", ".join(
+                f"{column} {SQL_TYPES[dataset.schema[column]]}" for column in columns
+            )
+            con.execute(f"CREATE OR REPLACE TABLE {target} ({types})")
+        else:
+            con.execute(
+                f"CREATE OR REPLACE TABLE {target} AS SELECT * FROM staged LIMIT 0"
+            )
+
+
+def _matches_catalog(columns: dict[str, str], dataset: Dataset, types: dict) -> bool:
+    """Whether a table with these columns and information_schema types can be
+    merged into: it exists with exactly the file columns of the dataset and
+    their catalog types. Any existing table can without a schema."""
+
+    if not columns or not dataset.schema:
+        return bool(columns)
+    return columns == {
+        column: types[SQL_TYPES[dataset.schema[column]]]
+        for column in file_columns(dataset)
+    }
+
+
+def _key_join(table: str, other: str, keys: list[str]) -> str:
+    return " AND ".join(f"{table}.{key} = {other}.{key}" for key in keys)
+
+
+@cache
+def get_warehouse() -> Redshift | DuckDB:
+    """Warehouse backend selected with WAREHOUSE_BACKEND"""
+
+    backend = os.getenv("WAREHOUSE_BACKEND", "redshift")
+
+    if backend == "redshift":
+        return Redshift(
+            os.getenv("REDSHIFT_SECRET_ID", "dpstack-admin-secret"),
+            int(os.getenv("REDSHIFT_SLICES", DEFAULT_SLICES)),
+        )
+    elif backend == "duckdb":
+        return DuckDB(os.getenv("DUCKDB_DATABASE", "warehouse.duckdb"))
+    else:
+        raise ValueError(f"Unsupported warehouse backend: {backend}")
+
+
+@cache
+def get_pool() -> ConnectionPool:
+    """Connections to the selected warehouse, at most WAREHOUSE_POOL_SIZE"""
+
+    return ConnectionPool(
+        get_warehouse().connect, max_size=int(os.getenv("WAREHOUSE_POOL_SIZE", "4"))
+    )
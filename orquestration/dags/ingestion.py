@@ -1,36 +1,119 @@
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
+
+import yaml
 from airflow import DAG
+from airflow.models.param import Param
 from airflow.providers.amazon.aws.operators.batch import BatchOperator
+from airflow.utils.task_group import TaskGroup
 
-# Create the DAG
-dag = DAG(
-    "ingestion",
-    start_date=datetime(2024, 1, 1),
-    description="Manual DAG to run AWS Batch job with Python image and main.py script",
-    catchup=False,
-    tags=["ingestion", "python"],
+#: ingestion/config/catalog.yml, deployed next to the DAGs by deploy_dags.py
+CATALOG_PATH = os.getenv(
+    "CATALOG_PATH", os.path.join(os.path.dirname(__file__), "config", "catalog.yml")
 )
+#: Pool every Batch task runs in. Create it with include_deferred to bound the
+#: Batch jobs waited on across all DAG runs
+POOL = os.getenv("INGESTION_POOL", "default_pool")
+#: Mapped transformation jobs per source, each one a shard of the raw objects
+SHARDS = int(os.getenv("INGESTION_SHARDS", "4"))
+#: Shards of one source running at the same time
+MAX_ACTIVE_SHARDS = int(os.getenv("INGESTION_MAX_ACTIVE_SHARDS", "4"))
+#: Seconds between job status checks. Fargate jobs take a minute or more to
+#: start, polling more often only adds DescribeJobs calls
+POLL_SECONDS = int(os.getenv("INGESTION_POLL_SECONDS", "30"))
+#: Longest a job may run before the task fails
+JOB_TIMEOUT = timedelta(hours=int(os.getenv("INGESTION_JOB_TIMEOUT_HOURS", "6")))
 
-# AWS Batch job task
-transformation = BatchOperator(
-    task_id="ignestion-task-1",
-    job_name="transformation-job",
-    job_definition="ingestion-job",
-    job_queue="dpstack-batch-queue",
-    region_name="eu-west-1",
-    container_overrides={"command": ["python", "spacex/transformation.py"]},
-    dag=dag,
-)
+#: Resource profiles infra registers as ingestion-job-<profile>, in
+#: BatchConfig.profiles. Each run can pick one per step in its params.
+PROFILES = ["small", "medium", "large"]
+TRANSFORM_PROFILE = os.getenv("INGESTION_TRANSFORM_PROFILE", "large")
+LOAD_PROFILE = os.getenv("INGESTION_LOAD_PROFILE", "small")
 
-copy_job = BatchOperator(
-    task_id="ignestion-task-2",
-    job_name="copy-job",
-    job_definition="ingestion-job",
-    job_queue="dpstack-batch-queue",
-    region_name="eu-west-1",
-    container_overrides={"command": ["python", "spacex/ingest.py"]},
-    dag=dag,
-)
+BATCH_ARGS = {
+    #: Queues in BatchConfig.queues, Fargate Spot first or on-demand only
+    "job_queue": (
+        "{{ 'dpstack-batch-queue' if params.spot else 'dpstack-batch-ondemand-queue' }}"
+    ),
+    "region_name": "eu-west-1",
+    "pool": POOL,
+    #: Wait for the job in the triggerer instead of holding a worker slot
+    "deferrable": True,
+    "poll_interval": POLL_SECONDS,
+    "max_retries": int(JOB_TIMEOUT.total_seconds() // POLL_SECONDS),
+    "execution_timeout": JOB_TIMEOUT,
+}
+
+
+def load_sources(path: str) -> dict[str, list[str]]:
+    """Raw dataset -> stage datasets transformed from it and loaded to a table"""
+
+    with open(path) as f:
+        catalog = yaml.safe_load(f)
+
+    sources = {}
+    for name, config in catalog.items():
+        if config.get("source") and config.get("table"):
+            sources.setdefault(config["source"], []).append(name)
+    return sources
 
-# Set the task (no dependencies since it's a single task)
-transformation >> copy_job
+
+def source_group(source: str, datasets: list[str]) -> TaskGroup:
+    """Transform a raw dataset in mapped shards, then load each of its stage
+    datasets once every shard is done, independently of each other"""
+
+    #: raw_spacex is transformed and loaded by the spacex package
+    package = source.removeprefix("raw_")
+
+    with TaskGroup(group_id=source) as group:
+        transform = BatchOperator.partial(
+            task_id="transform",
+            job_name=f"{package}-transformation-job",
+            job_definition="ingestion-job-{{ params.transform_profile }}",
+            max_active_tis_per_dagrun=MAX_ACTIVE_SHARDS,
+            **BATCH_ARGS,
+        ).expand(
+            container_overrides=[
+                {
+                    "command": [
+                        "python",
+                        f"{package}/transformation.py",
+                        f"--shard={shard}",
+                        f"--shards={SHARDS}",
+                    ]
+                }
+                for shard in range(SHARDS)
+            ]
+        )
+
+        for dataset in datasets:
+            load = BatchOperator(
+                task_id=f"load_{dataset}",
+                job_name=f"{package}-load-job",
+                job_definition="ingestion-job-{{ params.load_profile }}",
+                container_overrides={
+                    "command": ["python", f"{package}/ingest.py", dataset]
+                },
+                **BATCH_ARGS,
+            )
+            transform >> load
+
+    return group
+
+
+with DAG(
+    "ingestion",
+    start_date=datetime(2024, 1, 1),
+    description="Transform and load every source in the ingestion catalog on AWS Batch",
+    catchup=False,
+    tags=["ingestion", "python"],
+    params={
+        "transform_profile": Param(TRANSFORM_PROFILE, enum=PROFILES),
+        "load_profile": Param(LOAD_PROFILE, enum=PROFILES),
+        #: Off for runs that must not be slowed down by Spot interruptions
+        "spot": Param(True, type="boolean"),
+    },
+) as dag:
+    #: One task group per source, sources don't wait for each other
+    for source, datasets in load_sources(CATALOG_PATH).items():
+        source_group(source, datasets)
@@ -0,0 +1,151 @@
+"""Run the ingestion DAG locally against a stubbed AWS Batch.
+
+    pip install apache-airflow==3.0.6 "apache-airflow-providers-amazon[aiobotocore]"
+    python orquestration/stub_batch.py --polls 3 --fail cores_stage
+
+Nothing is submitted to AWS: every Batch API call made by BatchOperator, and
+by the triggerer while a task is deferred, is answered by StubBatch. A job
+succeeds after --polls status checks, or fails when its command contains a
+--fail pattern. Prints each task's outcome and the Batch calls it took.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import uuid
+from collections import Counter
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubResponse:
+    status_code = 200
+    headers = {}
+
+
+class StubBatch:
+    """In memory Batch jobs, answering botocore calls before they are sent"""
+
+    #: Status a job reaches on each DescribeJobs call until it finishes
+    STATES = ["SUBMITTED", "PENDING", "RUNNABLE", "STARTING", "RUNNING"]
+
+    def __init__(self, polls: int = 2, fail: list[str] | None = None):
+        self.polls = polls
+        self.fail = fail or []
+        self.jobs = {}
+        self.calls = Counter()
+
+    def __call__(self, model, params, **kwargs):
+        self.calls[model.name] += 1
+        body = json.loads(params["body"] or b"{}")
+        return StubResponse(), getattr(self, model.name)(body)
+
+    def SubmitJob(self, body: dict) -> dict:
+        job_id = str(uuid.uuid4())
+        command = " ".join(body.get("containerOverrides", {}).get("command", []))
+        self.jobs[job_id] = {
+            "jobId": job_id,
+            "jobName": body["jobName"],
+            "jobArn": f"arn:aws:batch:eu-west-1:000000000000:job/{job_id}",
+            "jobQueue": body["jobQueue"],
+            "jobDefinition": body["jobDefinition"],
+            "container": {"command": command.split()},
+            "attempts": [],
+            "checks": 0,
+            "failing": any(pattern in command for pattern in self.fail),
+        }
+        print(f"📤 Submitted {body['jobName']} to {body['jobQueue']}: {command}")
+        return {key: self.jobs[job_id][key] for key in ("jobId", "jobName", "jobArn")}
+
+    def _status(self, job: dict) -> str:
+        if job["checks"] <= self.polls:
+            return self.STATES[min(job["checks"], len(self.STATES) - 1)]
+        return "FAILED" if job["failing"] else "SUCCEEDED"
+
+    def DescribeJobs(self, body: dict) -> dict:
+        jobs = []
+        for job_id in body["jobs"]:
+            job = self.jobs[job_id]
+            job["checks"] += 1
+            described = {k: v for k, v in job.items() if k not in ("checks", "failing")}
+            jobs.append({**described, "status": self._status(job)})
+        return {"jobs": jobs}
+
+    def TerminateJob(self, body: dict) -> dict:
+        self.jobs[body["jobId"]]["failing"] = True
+        return {}
+
+
+def stub_clients(stub: StubBatch):
+    """Patch BatchClientHook so both its sync and async clients hit stub"""
+
+    import aiobotocore.session
+    import botocore.session
+    from airflow.providers.amazon.aws.hooks.batch_client import BatchClientHook
+
+    def get_client_type(self, region_name=None, config=None, deferrable=False):
+        session = (
+            aiobotocore.session.get_session()
+            if deferrable
+            else botocore.session.get_session()
+        )
+        session.register("before-call.batch", stub)
+        return session.create_client(
+            "batch",
+            region_name="eu-west-1",
+            aws_access_key_id="stub",
+            aws_secret_access_key="stub",
+        )
+
+    return mock.patch.object(BatchClientHook, "get_client_type", get_client_type)
+
+
+def load_dag():
+    spec = importlib.util.spec_from_file_location(
+        "ingestion_dag", os.path.join(ROOT, "orquestration", "dags", "ingestion.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.dag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=2)
+    parser.add_argument("--fail", nargs="*", default=[])
+    parser.add_argument("--on-demand", action="store_true")
+    args = parser.parse_args()
+
+    #: A throwaway Airflow home and database, and the catalog from this repo
+    os.environ.setdefault("AIRFLOW_HOME", tempfile.mkdtemp())
+    os.environ.setdefault("AIRFLOW__CORE__LOAD_EXAMPLES", "false")
+    os.environ.setdefault(
+        "CATALOG_PATH", os.path.join(ROOT, "ingestion", "config", "catalog.yml")
+    )
+    os.environ.setdefault("INGESTION_POLL_SECONDS", "1")
+
+    from airflow.utils.db import initdb
+
+    initdb()
+    stub = StubBatch(args.polls, args.fail)
+    with stub_clients(stub):
+        dag_run = load_dag().test(run_conf={"spot": not args.on_demand})
+
+    print()
+    for ti in sorted(dag_run.get_task_instances(), key=lambda ti: ti.task_id):
+        index = "" if ti.map_index < 0 else f"[{ti.map_index}]"
+        print(
+            f"{'✅' if ti.state == 'success' else '❌'} {ti.task_id}{index} {ti.state}"
+        )
+    print(f"Batch calls: {dict(stub.calls)}")
+
+    if dag_run.state != "success":
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,32 @@
-import boto3
-import os
+import argparse
 
+from s3_sync import upload
 
-def deploy_dags():
-    s3 = boto3.client("s3")
-    dags_dir = "orquestration/dags"
 
-    for file in os.listdir(dags_dir):
-        file_path = os.path.join(dags_dir, file)
-
-        # Skip directories and non-Python files
-        if os.path.isdir(file_path) or not file.endswith(".py"):
-            print(f"⏭️ Skipping {file} (not a Python file)")
-            continue
-
-        try:
-            s3.upload_file(file_path, "dpstack-airflow", f"dags/{file}")
-            print(f"✅ Uploaded {file} to S3")
-        except Exception as e:
-            print(f"❌ Error uploading {file}: {str(e)}")
+def deploy_dags(dry_run: bool = False):
+    #: Only changed DAG files are uploaded, so MWAA only re-parses those, and
+    #: DAG files removed from the repository are removed from the bucket
+    _, failed = upload(
+        "orquestration/dags",
+        "s3://dpstack-airflow/dags/",
+        include="*.py",
+        delete=True,
+        dry_run=dry_run,
+    )
+    #: The ingestion DAG is generated from the dataset catalog
+    _, failed_config = upload(
+        "ingestion/config",
+        "s3://dpstack-airflow/dags/config/",
+        include="catalog.yml",
+        dry_run=dry_run,
+    )
+    if failed or failed_config:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
-    deploy_dags()
+    parser = argparse.ArgumentParser(description="Deploy the DAGs to MWAA")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only print what would change"
+    )
+    deploy_dags(parser.parse_args().dry_run)
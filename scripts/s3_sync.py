@@ -0,0 +1,234 @@
+"""Sync a local directory with an S3 prefix, skipping files that are unchanged.
+
+    python scripts/s3_sync.py orquestration/dags s3://dpstack-airflow/dags/ --include "*.py"
+    python scripts/s3_sync.py s3://dpstack-dlake/raw/ /tmp/raw
+
+Files are transferred concurrently, large ones in multipart chunks. A file is
+skipped when its ETag, computed locally with the same chunk size, matches the
+object in the bucket. --delete also removes what no longer exists in the
+source and --dry-run prints the changes without making them.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+#: Files transferred at the same time
+MAX_WORKERS = 16
+#: Parts uploaded or downloaded at the same time for each large file
+MAX_CONCURRENCY = 8
+MULTIPART_THRESHOLD = 16 * 2**20
+MULTIPART_CHUNKSIZE = 16 * 2**20
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_CHUNKSIZE,
+    max_concurrency=MAX_CONCURRENCY,
+)
+
+
+def s3_client():
+    #: One connection per part in flight, across every worker
+    return boto3.client(
+        "s3", config=Config(max_pool_connections=MAX_WORKERS * MAX_CONCURRENCY)
+    )
+
+
+def split_s3_path(path: str) -> tuple[str, str]:
+    bucket, _, prefix = path.removeprefix("s3://").partition("/")
+    return bucket, prefix
+
+
+def local_etag(path: str) -> str:
+    """ETag S3 assigns to this file when uploaded with TRANSFER_CONFIG"""
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < MULTIPART_THRESHOLD:
+            return hashlib.md5(f.read()).hexdigest()
+
+        parts = [
+            hashlib.md5(chunk).digest()
+            for chunk in iter(lambda: f.read(MULTIPART_CHUNKSIZE), b"")
+        ]
+    return f"{hashlib.md5(b''.join(parts)).hexdigest()}-{len(parts)}"
+
+
+def _matches(name: str, include: str) -> bool:
+    return fnmatch.fnmatch(name.rsplit("/", 1)[-1], include)
+
+
+def local_files(directory: str, include: str = "*") -> dict[str, str]:
+    """Relative path -> file path for every file under directory"""
+
+    files = {}
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = [d for d in dirs if d != "__pycache__" and not d.startswith(".")]
+        for name in names:
+            if _matches(name, include):
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, directory).replace(os.sep, "/")] = path
+    return files
+
+
+def remote_etags(s3, bucket: str, prefix: str) -> dict[str, str]:
+    """Relative key -> ETag for every object under prefix"""
+
+    etags = {}
+    for page in s3.get_paginator("list_objects_v2").paginate(
+        Bucket=bucket, Prefix=prefix
+    ):
+        for obj in page.get("Contents", []):
+            if not obj["Key"].endswith("/"):
+                etags[obj["Key"][len(prefix) :]] = obj["ETag"].strip('"')
+    return etags
+
+
+def _sync(
+    transfers: dict, deletes: dict, workers: int, dry_run: bool
+) -> tuple[list[str], list[str]]:
+    """Run name -> callable transfers and deletes concurrently, returns (done,
+    failed) names. With dry_run only print what would change."""
+
+    if dry_run:
+        for name in sorted(transfers):
+            print(f"~ {name}")
+        for name in sorted(deletes):
+            print(f"- {name}")
+        return [], []
+
+    done, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run): (name, verb)
+            for changes, verb in [(transfers, "transferring"), (deletes, "deleting")]
+            for name, run in changes.items()
+        }
+        for future in as_completed(futures):
+            name, verb = futures[future]
+            try:
+                future.result()
+                done.append(name)
+                print(f"{'✅' if verb == 'transferring' else '🗑️'} {name}")
+            except Exception as e:
+                failed.append(name)
+                print(f"❌ Error {verb} {name}: {str(e)}")
+    return sorted(done), sorted(failed)
+
+
+def upload(
+    directory: str,
+    s3_path: str,
+    include: str = "*",
+    workers: int = MAX_WORKERS,
+    delete: bool = False,
+    dry_run: bool = False,
+) -> tuple[list[str], list[str]]:
+    """Upload new and changed files under directory to s3_path, and with delete
+    remove objects matching include that no longer exist locally"""
+
+    s3 = s3_client()
+    bucket, prefix = split_s3_path(s3_path)
+    etags = remote_etags(s3, bucket, prefix)
+    files = local_files(directory, include)
+
+    def transfer(name: str):
+        s3.upload_file(files[name], bucket, prefix + name, Config=TRANSFER_CONFIG)
+
+    def remove(name: str):
+        s3.delete_object(Bucket=bucket, Key=prefix + name)
+
+    transfers = {
+        name: (lambda name=name: transfer(name))
+        for name, path in files.items()
+        if etags.get(name) != local_etag(path)
+    }
+    deletes = {
+        name: (lambda name=name: remove(name))
+        for name in etags
+        if delete and name not in files and _matches(name, include)
+    }
+    print(f"⏭️ {len(files) - len(transfers)} unchanged files")
+    return _sync(transfers, deletes, workers, dry_run)
+
+
+def download(
+    s3_path: str,
+    directory: str,
+    include: str = "*",
+    workers: int = MAX_WORKERS,
+    delete: bool = False,
+    dry_run: bool = False,
+) -> tuple[list[str], list[str]]:
+    """Download new and changed objects under s3_path to directory, and with
+    delete remove files matching include that no longer exist in the bucket"""
+
+    s3 = s3_client()
+    bucket, prefix = split_s3_path(s3_path)
+    etags = {
+        name: etag
+        for name, etag in remote_etags(s3, bucket, prefix).items()
+        if _matches(name, include)
+    }
+    files = local_files(directory, include)
+
+    def transfer(name: str):
+        path = os.path.join(directory, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        s3.download_file(bucket, prefix + name, path, Config=TRANSFER_CONFIG)
+
+    transfers = {
+        name: (lambda name=name: transfer(name))
+        for name, etag in etags.items()
+        if name not in files or local_etag(files[name]) != etag
+    }
+    deletes = {
+        name: (lambda path=path: os.remove(path))
+        for name, path in files.items()
+        if delete and name not in etags
+    }
+    print(f"⏭️ {len(etags) - len(transfers)} unchanged files")
+    return _sync(transfers, deletes, workers, dry_run)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Local directory or s3://bucket/prefix/")
+    parser.add_argument("destination", help="Local directory or s3://bucket/prefix/")
+    parser.add_argument("--include", default="*", help="File name pattern to sync")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument(
+        "--delete", action="store_true", help="Remove files missing from source"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only print what would change"
+    )
+    args = parser.parse_args()
+
+    if args.source.startswith("s3://"):
+        sync = download
+    elif args.destination.startswith("s3://"):
+        sync = upload
+    else:
+        parser.error("One of source or destination must be an s3:// path")
+
+    _, failed = sync(
+        args.source,
+        args.destination,
+        args.include,
+        args.workers,
+        delete=args.delete,
+        dry_run=args.dry_run,
+    )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
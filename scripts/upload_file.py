@@ -1,10 +1,10 @@
-import boto3
+from s3_sync import upload
 
 
 def upload_spacex():
-    s3 = boto3.client("s3")
-    s3.upload_file("igestion/data/spacex.json", "dpstack-dlake", "raw/spacex.json")
-    print("✅ Uploaded spacex.json to S3")
+    _, failed = upload("ingestion/data", "s3://dpstack-dlake/raw/", include="*.json")
+    if failed:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":